@@ -0,0 +1,156 @@
+"""
+generate a synthetic but realistic compilation database for benchmarking:
+  compile_commands.json, make's *.d files and `ninja -t deps` style output.
+
+the output only depends on the arguments (seeded random), so runs are reproducible.
+"""
+import argparse
+import os
+import json
+import random
+import shlex
+from pathlib import Path
+
+
+_WARNINGS = ['-Wall', '-Wextra', '-Werror', '-Wshadow', '-Wno-unused-parameter', '-Wconversion', '-Wpedantic']
+_OPTIMIZE = ['-O0', '-O1', '-O2', '-O3', '-Os', '-Og']
+_MISC = ['-g', '-fPIC', '-pthread', '-fno-exceptions', '-fno-rtti', '-ffunction-sections', '-fdata-sections',
+         '-march=x86-64', '-fvisibility=hidden', '-fstack-protector-strong']
+
+
+class SyntheticProject(object):
+    """
+    a fake source tree: N translation units spread over directories, a pool of
+    headers, and K distinct flag sets shared by the TUs.
+    """
+
+    def __init__(self, root: str, entries: int = 1000, flag_sets: int = 20, headers: int = 2000,
+                 includes_per_tu: int = 40, style: str = 'arguments', seed: int = 0):
+        assert style in ('arguments', 'command', 'mixed')
+        self.root = os.path.abspath(root)
+        self.entries = entries
+        self.style = style
+        self.includes_per_tu = includes_per_tu
+        self.rng = random.Random(seed)
+
+        rng = self.rng
+        self.headers = [f'{self.root}/include/mod{h % 97:02d}/header_{h:05d}.h' for h in range(headers)]
+        self.system_headers = [f'/usr/include/c++/12/bits/sys_{h:03d}.h' for h in range(200)]
+        self.flag_sets = []  # type:list[list[str]]
+        for k in range(max(1, flag_sets)):
+            flags = [rng.choice(_OPTIMIZE)]
+            flags += rng.sample(_WARNINGS, rng.randint(1, 4))
+            flags += rng.sample(_MISC, rng.randint(1, 5))
+            flags += [f'-I{self.root}/include/mod{m:02d}' for m in rng.sample(range(97), rng.randint(2, 12))]
+            flags += ['-isystem', f'{self.root}/third_party/lib{k % 7}/include']
+            flags += [f'-DFEATURE_{d}' for d in rng.sample(range(300), rng.randint(3, 30))]
+            flags += [f'-DCONFIG_LEVEL={k % 5}', '-D', f'FLAGSET_{k}']
+            self.flag_sets.append(flags)
+
+    def source(self, n: int) -> str:
+        ext = '.cpp' if n % 3 else '.c'
+        return f'src/dir{n // 100:04d}/file_{n:06d}{ext}'
+
+    def object(self, n: int) -> str:
+        return f'build/dir{n // 100:04d}/file_{n:06d}.o'
+
+    def arguments(self, n: int) -> list:
+        src = self.source(n)
+        compiler = '/usr/bin/c++' if src.endswith('.cpp') else '/usr/bin/cc'
+        flags = self.flag_sets[n % len(self.flag_sets)]
+        return [compiler] + flags + ['-o', self.object(n), '-c', src]
+
+    def includes(self, n: int) -> list:
+        rng = random.Random(n)  # stable per TU, independent of generation order
+        k = min(self.includes_per_tu, len(self.headers))
+        # a few very popular headers plus a tail, like real projects
+        hot = self.headers[:max(1, k // 4)]
+        return hot + rng.sample(self.headers, k - len(hot)) + rng.sample(self.system_headers, 5)
+
+    def compile_commands(self) -> list:
+        js = []
+        for n in range(self.entries):
+            dic = {'directory': self.root, 'file': self.source(n), 'output': self.object(n)}
+            style = self.style
+            if style == 'mixed':
+                style = 'command' if n % 2 else 'arguments'
+            if style == 'command':
+                dic['command'] = shlex.join(self.arguments(n))
+            else:
+                dic['arguments'] = self.arguments(n)
+            js.append(dic)
+        return js
+
+    def make_rule(self, n: int) -> str:
+        """
+        a rule like `gcc -MM` prints: target, the source, then headers with line continuations.
+        """
+        parts = [self.source(n)] + self.includes(n)
+        lines = []
+        for i in range(0, len(parts), 4):
+            lines.append(' '.join(parts[i:i + 4]))
+        return f'{Path(self.object(n)).name}: ' + ' \\\n  '.join(lines) + '\n'
+
+    def write_compile_commands(self, path: str = None) -> str:
+        path = path or os.path.join(self.root, 'compile_commands.json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, mode='w', encoding='utf-8') as fd:
+            json.dump(self.compile_commands(), fd, indent=2)
+        return path
+
+    def write_d_files(self) -> list:
+        """
+        build/dirXXXX/file_N.d next to an (empty) file_N.o, as `-MMD` leaves them.
+        """
+        dfiles = []
+        for n in range(self.entries):
+            obj = Path(self.root, self.object(n))
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            obj.touch()
+            dfile = obj.with_suffix('.d')
+            dfile.write_text(self.make_rule(n), encoding='utf-8')
+            dfiles.append(dfile)
+        return dfiles
+
+    def write_ninja_deps(self, path: str = None) -> str:
+        """
+        text in the form `ninja -t deps` prints for a .ninja_deps log.
+        """
+        path = path or os.path.join(self.root, 'ninja_deps.txt')
+        with open(path, mode='w', encoding='utf-8') as fd:
+            for n in range(self.entries):
+                deps = [self.source(n)] + self.includes(n)
+                fd.write(f'{self.object(n)}: #deps {len(deps)}, deps mtime 1700000000000000000 (VALID)\n')
+                for d in deps:
+                    fd.write(f'    {d}\n')
+                fd.write('\n')
+        return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic compilation database for benchmarks')
+    parser.add_argument('output_root', type=str, help='folder to generate the fake project in')
+    parser.add_argument('-n', '--entries', type=int, default=1000, help='number of compile commands')
+    parser.add_argument('-k', '--flag-sets', type=int, default=20, help='number of distinct flag sets')
+    parser.add_argument('--headers', type=int, default=2000, help='size of the header pool')
+    parser.add_argument('--includes-per-tu', type=int, default=40, help='headers included by each TU')
+    parser.add_argument('--style', type=str, choices=['arguments', 'command', 'mixed'], default='arguments',
+                        help='use `arguments` lists, `command` strings, or both. [default: arguments]')
+    parser.add_argument('--d-files', action='store_true', help='also write *.d files')
+    parser.add_argument('--ninja-deps', action='store_true', help='also write `ninja -t deps` style output')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(vars(args))
+
+    proj = SyntheticProject(args.output_root, entries=args.entries, flag_sets=args.flag_sets,
+                            headers=args.headers, includes_per_tu=args.includes_per_tu,
+                            style=args.style, seed=args.seed)
+    print('written:', proj.write_compile_commands())
+    if args.d_files:
+        print('written:', len(proj.write_d_files()), '*.d files')
+    if args.ninja_deps:
+        print('written:', proj.write_ninja_deps())
+
+
+if __name__ == '__main__':
+    main()
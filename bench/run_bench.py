@@ -0,0 +1,209 @@
+"""
+benchmarks of the translator, scanners and parsers on synthetic databases.
+
+each case is timed (best of --repeat) and, in a separate run, traced with
+tracemalloc for its peak memory. results can be saved as a baseline and later
+runs are compared against it.
+"""
+import argparse
+import sys
+import os
+import io
+import json
+import time
+import tempfile
+import tracemalloc
+import contextlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from json2cmakelists.translator import CompilationDatabaseTranslator  # noqa: E402
+from json2cmakelists.ninjadeps import _parse_compile_commands_json  # noqa: E402
+from json2cmakelists.makerules import filter_d_files, parse_d_file  # noqa: E402
+from json2cmakelists.compilerdeps import extractFilesFromMakeRule  # noqa: E402
+from gen_compdb import SyntheticProject  # noqa: E402
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000}
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def bench_convert_db_to_cmakelists(proj: SyntheticProject):
+    translator = CompilationDatabaseTranslator()
+    with open(proj.write_compile_commands(), encoding='utf-8') as fd:
+        translator.load(fd)
+
+    def run():
+        translator.convert_db_to_cmakelists(io.StringIO())
+    return run
+
+
+def bench_parse_compile_commands_json(proj: SyntheticProject):
+    ccfile = proj.write_compile_commands()
+
+    def run():
+        _parse_compile_commands_json(ccfile)
+    return run
+
+
+def bench_parse_d_file(proj: SyntheticProject):
+    dfiles = proj.write_d_files()
+
+    def run():
+        for dfile in dfiles:
+            parse_d_file(dfile)
+    return run
+
+
+def bench_filter_d_files(proj: SyntheticProject):
+    dfiles = proj.write_d_files()
+
+    def run():
+        filter_d_files(dfiles)
+    return run
+
+
+def bench_extractFilesFromMakeRule(proj: SyntheticProject):
+    rules = [proj.make_rule(n) for n in range(proj.entries)]
+
+    def run():
+        for rule in rules:
+            extractFilesFromMakeRule(rule)
+    return run
+
+
+BENCHMARKS = {
+    'convert_db_to_cmakelists':    bench_convert_db_to_cmakelists,
+    '_parse_compile_commands_json': bench_parse_compile_commands_json,
+    'parse_d_file':                bench_parse_d_file,
+    'filter_d_files':              bench_filter_d_files,
+    'extractFilesFromMakeRule':    bench_extractFilesFromMakeRule,
+}
+
+
+def measure(run, repeat: int, memory: bool) -> dict:
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):  # the code under test is chatty
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - t0)
+        peak = None
+        if memory:
+            tracemalloc.start()
+            try:
+                run()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    return {'time_s': min(times), 'peak_bytes': peak}
+
+
+def environment(args) -> dict:
+    """
+    what a baseline was recorded on and with, stored under its '_meta' key.
+    """
+    import platform
+    return {
+        'machine':   platform.machine(),
+        'processor': platform.processor() or None,
+        'cpus':      os.cpu_count(),
+        'system':    platform.platform(),
+        'python':    platform.python_version(),
+        'settings':  {'flag_sets': args.flag_sets, 'style': args.style},
+        'repeat':    args.repeat,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    :return: descriptions of the cases slower/bigger than baseline * (1 + tolerance)
+    """
+    regressions = []
+    for key, cur in sorted(results.items()):
+        old = baseline.get(key)
+        if not old:
+            print(f'{key:48s} (no baseline)')
+            continue
+        line = f'{key:48s}'
+        for metric in ('time_s', 'peak_bytes'):
+            if cur.get(metric) is None or not old.get(metric):
+                continue
+            ratio = cur[metric] / old[metric]
+            line += f'  {metric} x{ratio:.2f}'
+            if ratio > 1.0 + tolerance:
+                regressions.append(f'{key} {metric}: {old[metric]} -> {cur[metric]}')
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark json2cmakelists on synthetic compilation databases')
+    parser.add_argument('-s', '--scale', type=str, nargs='+', choices=sorted(SCALES), default=['1k', '10k'],
+                        help='database sizes to run. [default: 1k 10k]')
+    parser.add_argument('-b', '--bench', type=str, nargs='+', choices=sorted(BENCHMARKS), default=None,
+                        help='benchmarks to run. [default: all]')
+    parser.add_argument('-k', '--flag-sets', type=int, default=20, help='distinct flag sets in the database')
+    parser.add_argument('--style', type=str, choices=['arguments', 'command', 'mixed'], default='arguments')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='timed runs per case, best is kept')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE, help='baseline json file')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative slowdown before failing. [default: 0.25]')
+    parser.add_argument('-o', '--output', type=str, default=None, help='also write results as json to file')
+    args = parser.parse_args()
+
+    results = {}
+    for scale in args.scale:
+        for name in (args.bench or BENCHMARKS):
+            with tempfile.TemporaryDirectory(prefix='j2c-bench-') as tmp:
+                proj = SyntheticProject(tmp, entries=SCALES[scale], flag_sets=args.flag_sets, style=args.style)
+                old_dir = os.getcwd()
+                os.chdir(tmp)  # the translator expects to run beside compile_commands.json
+                try:
+                    run = BENCHMARKS[name](proj)
+                    res = measure(run, args.repeat, not args.no_memory)
+                finally:
+                    os.chdir(old_dir)
+            key = f'{name}@{scale}'
+            results[key] = res
+            peak = '-' if res['peak_bytes'] is None else f"{res['peak_bytes'] / 2**20:.1f}MiB"
+            print(f"{key:48s} {res['time_s']:10.4f}s {peak:>10s}", flush=True)
+
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as fd:
+            json.dump(results, fd, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as fd:
+                baseline = json.load(fd)
+        baseline.update(results)
+        baseline['_meta'] = environment(args)
+        with open(args.baseline, mode='w', encoding='utf-8') as fd:
+            json.dump(baseline, fd, indent=2, sort_keys=True)
+            fd.write('\n')
+        print(f'baseline saved: {args.baseline}')
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as fd:
+            baseline = json.load(fd)
+        print(f'compare with baseline: {args.baseline}')
+        meta = baseline.get('_meta')
+        if meta:
+            print(f"  recorded on {meta['system']}, {meta['cpus']} cpus, python {meta['python']}")
+            if meta['settings'] != environment(args)['settings']:
+                print(f"  WARN: recorded with {meta['settings']}, timings are not comparable")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('REGRESSIONS:')
+            for r in regressions:
+                print('  ' + r)
+            sys.exit(1)
+    else:
+        print(f'no baseline at {args.baseline}, use --save-baseline to create one')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+json2cmakelists: generate CMakeLists.txt and file lists from a JSON compilation database.
+
+the library parts are imported on first use:
+    from json2cmakelists import CompilationDatabaseTranslator
+"""
+
+__version__ = '0.2.0'
+
+_LAZY = {
+    'CompilationDatabaseTranslator': 'translator',
+    'RunStats':                      'stats',
+    'iter_compiler_deps':            'compilerdeps',
+    'extractFilesFromMakeRule':      'compilerdeps',
+    'DefinitionIndex':               'compilerdeps',
+    'iter_source_files':             'ninjadeps',
+    'iter_compile_commands':         'ninjadeps',
+    'iter_macros':                   'ninjadeps',
+    'iter_ninja_deps':               'ninjadeps',
+    'iter_d_files':                  'makerules',
+    'iter_dependencies':             'makerules',
+    'parse_d_file':                  'makerules',
+    'ExternalSorter':                'extsort',
+    'PathFilter':                    'pathfilter',
+    'diff_databases':                'dbdiff',
+    'PathList':                      'pathlist',
+    'write_pathlist':                'pathlist',
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    import importlib
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
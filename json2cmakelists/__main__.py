@@ -0,0 +1,10 @@
+import sys
+
+if __package__:
+    from .cli import main
+else:  # run as `python3 /path/to/json2cmakelists`
+    import os
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from json2cmakelists.cli import main
+
+sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+convert compile_commands.json with `arguments` entry to `command` form.
+
+Ref:
+    https://clang.llvm.org/docs/JSONCompilationDatabase.html
+    https://releases.llvm.org/4.0.0/tools/clang/docs/JSONCompilationDatabase.html
+"""
+import json
+import time
+
+
+def getOutputPath(path: str, postfix: str = None):
+    if postfix is None:
+        postfix = time.strftime("%Y-%m-%d_%H-%M-%S_%Z")
+    newname = f'{path}.{postfix}'
+    return newname
+
+
+def iter_command_entries(j: list):
+    """
+    each entry with `arguments` joined into `command`.
+    """
+    for unit in j:
+        item = {
+            'directory': unit['directory'],
+            'command': ' '.join(unit['arguments']),  # arguments -> command
+            'file': unit['file'],
+        }
+        if 'output' in unit:
+            item.update({'output': unit['output']})
+        yield item
+
+
+def cvtCompileCommandsArg2cmd(inputjson_path: str, outputjson_path: str):
+    with open(inputjson_path, encoding='utf-8') as fi, open(outputjson_path, mode='w+', encoding='utf-8') as fo:
+        j = json.load(fi)
+
+        fo.write('[\n')
+        for n, item in enumerate(iter_command_entries(j)):
+            s = json.dumps(item, indent=2)
+            if n != 0:
+                fo.write(',\n')
+            fo.write(s)
+        fo.write('\n]\n')
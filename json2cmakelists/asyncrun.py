@@ -0,0 +1,116 @@
+"""
+run many shell commands with asyncio: a bounded number at a time, each with a timeout and retries.
+
+stdout is fed line by line to a parser while the command runs, stderr is kept for the failure
+report. a command that times out is killed with its whole process group, so a hung compiler
+does not outlive its job.
+"""
+import os
+import signal
+import asyncio
+import time
+
+from .stats import NOSTATS
+
+
+STDERR_TAIL = 4000  # characters of stderr kept per failure
+
+
+class CommandFailed(Exception):
+    def __init__(self, error: str, stderr: str = ''):
+        super().__init__(error)
+        self.error = error
+        self.stderr = stderr
+
+
+def _kill(proc):
+    if proc.returncode is not None:
+        return
+    try:
+        if os.name == 'posix':
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except ProcessLookupError:
+        pass
+
+
+async def run_command(cmdline: str, cwd: str, parser, timeout: float = None):
+    """
+    run cmdline in a shell, feed each stdout line to parser.feed(), return parser.result().
+    raises CommandFailed on a non-zero exit code or after `timeout` seconds.
+    """
+    proc = await asyncio.create_subprocess_shell(cmdline, cwd=cwd, stdin=asyncio.subprocess.DEVNULL,
+                                                 stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                                                 start_new_session=os.name == 'posix')
+
+    async def read_stdout():
+        async for line in proc.stdout:
+            parser.feed(line.decode('utf-8', errors='surrogateescape'))
+
+    async def finish():
+        _, err = await asyncio.gather(read_stdout(), proc.stderr.read())
+        return await proc.wait(), err.decode('utf-8', errors='replace')
+
+    try:
+        code, stderr = await asyncio.wait_for(finish(), timeout)
+    except asyncio.TimeoutError:
+        raise CommandFailed(f'timeout after {timeout}s')
+    finally:
+        _kill(proc)  # timed out, cancelled, or a parser error
+        await proc.wait()
+    if code:
+        raise CommandFailed(f'exit code {code}', stderr[-STDERR_TAIL:])
+    return parser.result()
+
+
+def run_jobs(jobs, make_parser, on_done, on_failed, concurrency: int = 1, timeout: float = None,
+             retries: int = 0, retry_delay: float = 1.0, stats=NOSTATS):
+    """
+    run the commands of jobs, at most `concurrency` at a time, in completion order.
+
+    :param jobs: iterable of (key, cmdline, cwd), consumed as commands start
+    :param make_parser: called with no argument for a new stdout parser per attempt,
+                        an object with feed(line) and result()
+    :param on_done: called with (key, parser result) as each job succeeds.
+                    an exception it raises fails the job instead
+    :param on_failed: called with (key, {'error': str, 'stderr': str, 'attempts': int})
+                      once a job has failed `retries` + 1 times
+    :param retry_delay: seconds before the first retry, doubled for each next one
+    """
+    jobs = iter(jobs)
+
+    async def run_one(key, cmdline: str, cwd: str):
+        for attempt in range(retries + 1):
+            if attempt:
+                stats.count('retries')
+                await asyncio.sleep(retry_delay * 2 ** (attempt - 1))
+            t0 = time.perf_counter()
+            try:
+                res = await run_command(cmdline, cwd, make_parser(), timeout)
+            except (CommandFailed, OSError, ValueError) as e:
+                if isinstance(e, CommandFailed) and e.error.startswith('timeout'):
+                    stats.count('timeouts')
+                failure = {'error':    getattr(e, 'error', f'{type(e).__name__}: {e}'),
+                           'stderr':   getattr(e, 'stderr', ''),
+                           'attempts': attempt + 1}
+                continue
+            finally:
+                stats.latency('compiler', time.perf_counter() - t0)
+            try:
+                on_done(key, res)
+            except Exception as e:  # the output made no sense, retrying will not help
+                failure = {'error': f'{type(e).__name__}: {e}', 'stderr': '', 'attempts': attempt + 1}
+                break
+            return
+        stats.count('failed_entries')
+        on_failed(key, failure)
+
+    async def worker():
+        for key, cmdline, cwd in jobs:  # one shared iterator: each job is taken once
+            await run_one(key, cmdline, cwd)
+
+    async def main():
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+    asyncio.run(main())
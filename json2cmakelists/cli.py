@@ -0,0 +1,623 @@
+"""
+the `json2cmakelists` command line. each subcommand imports its module only when it runs,
+so `--help` and small runs start quickly.
+"""
+import sys
+import os
+import argparse
+
+COMMANDS = ('cmake', 'compiler-deps', 'compiler-deps-merge', 'ninja-deps', 'make-deps', 'arg2cmd', 'pathlist',
+            'diff', 'daemon')
+
+
+def _confirm_overwrite(paths: list, assume_yes: bool = False) -> bool:
+    """
+    ask before overwriting existing outputs. never blocks when stdin is not a terminal.
+    """
+    existing = [p for p in paths if os.path.exists(p)]
+    if not existing or assume_yes:
+        return True
+    if not sys.stdin.isatty():
+        print(f'Error: {" or ".join(existing)} already exist! use -y to overwrite.')
+        return False
+    while True:
+        yn = input(f'{" or ".join(existing)} already exist! Overwrite?[y/N]:').strip().casefold()
+        if yn in ('y', 'yes'):
+            return True
+        if yn in ('n', 'no', ''):
+            return False
+        print('make a choice...')
+
+
+def _stats(tool: str, enabled: bool):
+    from .stats import RunStats
+    return RunStats(tool, enabled=enabled)
+
+
+def _add_common(parser: argparse.ArgumentParser):
+    parser.add_argument('--stats', '--profile', type=str, default=None, metavar='FILE',
+                        help='write per-phase timing and counters as JSON to FILE')
+    parser.add_argument('-y', '--yes', action='store_true', help='overwrite existing outputs without asking')
+
+
+def _memory_size(text: str) -> int:
+    from .extsort import parse_size
+    try:
+        return parse_size(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _add_memory_limit(parser: argparse.ArgumentParser):
+    parser.add_argument('--memory-limit', type=_memory_size, default='256M', metavar='SIZE',
+                        help='memory for sorting the file list, beyond it sorted runs spill to '
+                             'temporary files (see TMPDIR). [default: 256M]')
+
+
+def _add_format(parser: argparse.ArgumentParser):
+    parser.add_argument('--format', type=str, choices=['text', 'binary'], default='text',
+                        help='file list as text, or as a sorted binary path list written to *.pathlist '
+                             'instead of *.txt, see `pathlist`. [default: text]')
+
+
+def _add_filter(parser: argparse.ArgumentParser, root_help: str):
+    parser.add_argument('--root', type=str, action='append', default=[], metavar='DIR', help=root_help)
+    parser.add_argument('--exclude', type=str, action='append', default=[], metavar='DIR',
+                        help='drop paths under DIR, unless under a deeper --root. repeatable')
+    parser.add_argument('--exclude-glob', type=str, action='append', default=[], metavar='PATTERN',
+                        help="drop paths matching an fnmatch PATTERN, e.g. '*/generated/*'. repeatable")
+
+
+def _path_filter(args, roots: list = ()):
+    from .pathfilter import PathFilter
+    return PathFilter(roots=list(roots) + args.root, excludes=args.exclude, exclude_globs=args.exclude_glob)
+
+
+def _filelist_output(path: str, output_format: str) -> str:
+    if output_format == 'binary':
+        from .pathlist import pathlist_name
+        return pathlist_name(path)
+    return path
+
+
+def cmd_cmake(args) -> int:
+    database_file = args.input
+    cmakelists_file = args.output or ('build.ninja' if args.backend == 'ninja' else 'CMakeLists.txt')
+
+    # check files existence
+    if os.path.isfile(database_file):
+        if os.path.dirname(os.path.realpath(database_file)) != os.getcwd():
+            print('Error: please run this script in the same dir of compile_commands.json')
+            return 1
+    else:
+        print('Error: %s not exist!' % database_file)
+        return 1
+    if not _confirm_overwrite([cmakelists_file], args.yes):
+        print('nothing done, exit.')
+        return 0
+
+    # run
+    from .translator import CompilationDatabaseTranslator
+    stats = _stats('json2cmakelists', args.stats is not None)
+    translator = CompilationDatabaseTranslator(stats)
+
+    with open(database_file, mode='r') as infd:
+        translator.load(infd)
+
+    if not args.keep_duplicates:
+        report = translator.remove_duplicates()
+        if report['removed'] or report['variants']:
+            print(f"duplicate entries removed: {len(report['removed'])}, "
+                  f"files compiled in several variants: {len(report['variants'])}")
+        if args.duplicates_report:
+            import json
+            with open(args.duplicates_report, mode='w', encoding='utf-8') as fd:
+                json.dump(report, fd, indent=2)
+            print(f'duplicates report: {args.duplicates_report}')
+
+    groups = None
+    if args.backend == 'cmake' and (args.group or args.deps_d or args.deps_ninja or args.deps_results):
+        groups = _plan_groups(args, translator, stats)
+
+    with open(cmakelists_file, mode='w') as outfd:
+        if args.backend == 'ninja':
+            translator.convert_db_to_ninja(outfd)
+        else:
+            translator.convert_db_to_cmakelists(outfd, groups=groups)
+
+    stats.dump(args.stats)
+    return 0
+
+
+def _plan_groups(args, translator, stats) -> list:
+    """
+    one target per flag set, with precompiled headers and unity batches recommended from dependency data.
+    """
+    from . import pch
+    tu_headers = {}
+    with stats.phase('deps'):
+        if args.deps_d:
+            from .makerules import iter_d_files
+            dfiles = list(iter_d_files(os.path.abspath(args.deps_d), stats=stats))
+            tu_headers.update(pch.tu_headers_from_d_files(dfiles, stats=stats))
+        if args.deps_ninja:
+            from .ninjadeps import _run_ninja_deps
+            root = os.path.abspath(args.deps_ninja)
+            deps_info = _run_ninja_deps(root, stats=stats)
+            if deps_info is not None:
+                tu_headers.update(pch.tu_headers_from_ninja(deps_info, root))
+        if args.deps_results:
+            tu_headers.update(pch.tu_headers_from_results(args.deps_results))
+    stats.count('dep_tus', len(tu_headers))
+
+    with stats.phase('plan'):
+        plan, report = pch.plan_build(translator.group_by_flags(), tu_headers,
+                                      pch_max=args.pch_max, pch_min_share=args.pch_min_share,
+                                      unity_batch=args.unity_batch)
+    if args.report:
+        import json
+        with open(args.report, mode='w', encoding='utf-8') as fd:
+            json.dump(report, fd, indent=2)
+        print(f'report: {args.report}')
+    else:
+        pch.print_report(report)
+    return plan
+
+
+def _compiler_deps_outputs(compile_commands_json: str) -> tuple:
+    from pathlib import Path
+    __compile_commands_json_path = Path(compile_commands_json)
+    opt_output_filelist = os.path.join(__compile_commands_json_path.parent, __compile_commands_json_path.stem + "-filelist.txt")
+    opt_output_definition = os.path.join(__compile_commands_json_path.parent, __compile_commands_json_path.stem + "-definition.txt")
+    return opt_output_filelist, opt_output_definition
+
+
+def cmd_compiler_deps(args) -> int:
+    from .compilerdeps import mainImpl, shardImpl, parse_shard_spec, conflicts_name
+
+    cwd = os.getcwd()
+    print(f"cwd: {cwd}")
+
+    opt_compile_commands_json = args.input
+    opt_output_filelist, opt_output_definition = _compiler_deps_outputs(opt_compile_commands_json)
+    opt_output_filelist = _filelist_output(opt_output_filelist, args.format)
+
+    if not os.path.exists(opt_compile_commands_json):
+        raise Exception(f"{opt_compile_commands_json} not exist!")
+
+    if args.shard:
+        shard, count = parse_shard_spec(args.shard)
+        opt_output_shard = args.shard_output or os.path.join(
+            os.path.dirname(opt_compile_commands_json),
+            f'{os.path.splitext(os.path.basename(opt_compile_commands_json))[0]}-shard-{shard}-of-{count}.jsonl')
+        opt_output_scan = os.path.splitext(opt_output_shard)[0] + '-scan.jsonl'
+        opt_output_failures = os.path.splitext(opt_output_shard)[0] + '-failures.json'
+        outputs = [opt_output_shard]
+        if not args.resume:
+            outputs.append(opt_output_scan)
+        if not _confirm_overwrite(outputs, args.yes):
+            print('exit.')
+            return 0
+        opt_stats = os.path.abspath(args.stats) if args.stats else None
+        stats = _stats('compile_commands-files', opt_stats is not None)
+        opt_compile_commands_json = os.path.abspath(opt_compile_commands_json)
+        print('input:', opt_compile_commands_json)
+        failed = shardImpl(cwd=os.path.dirname(opt_compile_commands_json), cc_json_file=opt_compile_commands_json,
+                           output_shard=opt_output_shard, shard=shard, count=count, stats=stats,
+                           path_filter=_path_filter(args), output_scan=opt_output_scan,
+                           output_failures=opt_output_failures, jobs=args.jobs, timeout=args.timeout,
+                           retries=args.retries, retry_delay=args.retry_delay, resume=args.resume)
+        print('output:', opt_output_shard)
+        if failed:
+            print('output:', opt_output_failures)
+        stats.dump(opt_stats)
+        return 1 if failed else 0
+
+    opt_output_scan = os.path.splitext(opt_compile_commands_json)[0] + '-scan.jsonl'
+    opt_output_failures = os.path.splitext(opt_compile_commands_json)[0] + '-failures.json'
+    outputs = [opt_output_filelist, opt_output_definition, conflicts_name(opt_output_definition)]
+    if not args.resume:
+        outputs.append(opt_output_scan)
+    if not _confirm_overwrite(outputs, args.yes):
+        print('exit.')
+        return 0
+    opt_compile_commands_json = os.path.abspath(os.path.join(cwd, opt_compile_commands_json))
+    opt_output_filelist = os.path.abspath(os.path.join(cwd, opt_output_filelist))
+    opt_output_definition = os.path.abspath(os.path.join(cwd, opt_output_definition))
+    opt_output_scan = os.path.abspath(os.path.join(cwd, opt_output_scan))
+    opt_output_failures = os.path.abspath(os.path.join(cwd, opt_output_failures))
+
+    opt_paths_unique = args.paths == 'unique'
+    opt_paths_compact = not args.no_compact_paths
+    opt_path_abs = args.path_style == 'absolute'
+
+    json_cwd = os.path.dirname(opt_compile_commands_json)
+    opt_stats = os.path.abspath(os.path.join(cwd, args.stats)) if args.stats else None
+    stats = _stats('compile_commands-files', opt_stats is not None)
+
+    print('input:', opt_compile_commands_json)
+    failed = mainImpl(cwd=json_cwd, cc_json_file=opt_compile_commands_json,
+                      output_filelist=opt_output_filelist, output_definition=opt_output_definition,
+                      paths_unique=opt_paths_unique, paths_compact=opt_paths_compact, path_abs=opt_path_abs,
+                      output_format=args.format, stats=stats, path_filter=_path_filter(args),
+                      output_scan=opt_output_scan, output_failures=opt_output_failures,
+                      jobs=args.jobs, timeout=args.timeout, retries=args.retries, retry_delay=args.retry_delay,
+                      resume=args.resume)
+    print('output:', opt_output_filelist)
+    print('output:', opt_output_definition)
+    print('output:', conflicts_name(opt_output_definition))
+    if failed:
+        print('output:', opt_output_failures)
+    stats.dump(opt_stats)
+    return 1 if failed else 0
+
+
+def cmd_compiler_deps_merge(args) -> int:
+    from .compilerdeps import merge_shards, conflicts_name
+
+    opt_output_filelist, opt_output_definition = _compiler_deps_outputs(args.input)
+    opt_output_filelist = _filelist_output(opt_output_filelist, args.format)
+    if not _confirm_overwrite([opt_output_filelist, opt_output_definition, conflicts_name(opt_output_definition)],
+                              args.yes):
+        print('exit.')
+        return 0
+    opt_stats = os.path.abspath(args.stats) if args.stats else None
+    stats = _stats('compile_commands-files', opt_stats is not None)
+
+    merge_shards(args.shards, opt_output_filelist, opt_output_definition,
+                 paths_unique=args.paths == 'unique', paths_compact=not args.no_compact_paths,
+                 output_format=args.format, stats=stats)
+    print('output:', opt_output_filelist)
+    print('output:', opt_output_definition)
+    print('output:', conflicts_name(opt_output_definition))
+    stats.dump(opt_stats)
+    return 0
+
+
+def cmd_ninja_deps(args) -> int:
+    from pathlib import Path
+    from . import ninjadeps
+    from .pathfilter import KEEP_ALL
+
+    print(f'posix: {ninjadeps.g_is_posix}; {vars(args)}')
+
+    cmakebuild_root = os.path.abspath(args.cmakebuild_root)
+    sourcetree_root = os.path.abspath(args.sourcetree_root)
+    assert os.path.exists(cmakebuild_root) and os.path.exists(sourcetree_root)
+    stats_file = os.path.abspath(args.stats) if args.stats else None
+    stats = _stats('get_compile_files_compilecommandsjson', stats_file is not None)
+
+    ninja = args.ninja
+    if ninja is None and sys.stdin.isatty():
+        ninja = ninjadeps._which_ninja(ask=lambda: input('where is ninja:').strip())
+
+    # includes: under sourcetree_root (unless --all) or a --root. sources: only the excludes apply
+    include_filter = _path_filter(args, [] if args.all else [sourcetree_root])
+    source_files, macros_dic = ninjadeps.get_source_files_and_macros(cmakebuild_root, stats=stats,
+                                                                     path_filter=include_filter.without_roots())
+    macros = sorted(macros_dic.items(), key=lambda x: -x[1])
+    print(f'result. sources:{len(source_files)}, macros:{len(macros)}')
+
+    print(f'writing result under: {sourcetree_root}')
+    output_filelist_txt = _filelist_output(os.path.join(sourcetree_root, f'{args.output_prefix}files.txt'), args.format)
+    output_macros_txt = os.path.join(sourcetree_root, f'{args.output_prefix}macros.txt')
+    if not _confirm_overwrite([output_filelist_txt, output_macros_txt], args.yes):
+        print('quit.')
+        return 0
+    if not macros:
+        Path(output_macros_txt).unlink(missing_ok=True)
+
+    # include files are streamed from ninja into the bounded-memory sort
+    include_files = ninjadeps.iter_include_files(cmakebuild_root, stats=stats, ninja=ninja, path_filter=include_filter)
+    with stats.phase('write'):
+        write = ninjadeps.write_filelist_binary if args.format == 'binary' else ninjadeps.write_filelist
+        written = write(output_filelist_txt, source_files, include_files, sourcetree_root,
+                        memory_limit=args.memory_limit, path_filter=KEEP_ALL, stats=stats)  # filtered while read
+        if macros:
+            ninjadeps.write_macros(output_macros_txt, macros)
+    print(f'files: {written}')
+    stats.count('output_files', written)
+    stats.count('macros', len(macros))
+    stats.dump(stats_file)
+    print('done.')
+    return 0
+
+
+def cmd_make_deps(args) -> int:
+    from pathlib import Path
+    from .makerules import iter_d_files, iter_dependencies
+    from .extsort import ExternalSorter
+
+    print(vars(args))
+
+    sourcetree_root = os.path.abspath(args.sourcetree_root)
+    assert os.path.exists(sourcetree_root)
+    stats = _stats('get_compile_files_makerule_d', args.stats is not None)
+
+    with stats.phase('scan'):
+        all_dfiles = list(iter_d_files(sourcetree_root, stats=stats))
+    stats.count('entries', len(all_dfiles))
+
+    output = _filelist_output(args.output, args.format)
+    with ExternalSorter(args.memory_limit, stats=stats) as deps:
+        deps.update(iter_dependencies(all_dfiles, stats=stats, path_filter=_path_filter(args)))
+
+        print(f'writing result under: {Path(os.getcwd(), output).parent}')
+        written = 0
+        with stats.phase('write'):
+            if args.format == 'binary':
+                from .pathlist import write_pathlist
+                written = write_pathlist(output, deps.iter_sorted())
+            else:
+                with open(output, mode='w', encoding='utf-8') as fd:
+                    for dep in deps.iter_sorted():
+                        print(dep, file=fd)
+                        written += 1
+    print(f"dependencies: {written}")
+    stats.count('distinct_paths', written)
+    stats.dump(args.stats)
+    return 0
+
+
+def cmd_arg2cmd(args) -> int:
+    from .arg2cmd import getOutputPath, cvtCompileCommandsArg2cmd
+
+    outputjson_path = getOutputPath(args.input)
+    cvtCompileCommandsArg2cmd(args.input, outputjson_path)
+    print(f'result: {args.input} --> {outputjson_path}')
+    return 0
+
+
+def cmd_pathlist(args) -> int:
+    from .pathlist import PathList, write_pathlist, pathlist_name
+
+    if args.mode == 'pack':
+        from .extsort import ExternalSorter
+        output = args.output or pathlist_name(args.input)
+        if not _confirm_overwrite([output], args.yes):
+            print('exit.')
+            return 0
+        with ExternalSorter(args.memory_limit) as paths:
+            with open(args.input, encoding='utf-8') as fd:
+                paths.update(line.rstrip('\n') for line in fd if line.strip())
+            count = write_pathlist(output, paths.iter_sorted(), block_size=args.block_size)
+        print(f'{args.input} --> {output}: {count} paths, {os.path.getsize(args.input)} -> {os.path.getsize(output)} bytes')
+        return 0
+
+    with PathList(args.input) as paths:
+        if args.mode == 'has':
+            missing = [p for p in args.paths if p not in paths]
+            for p in missing:
+                print(p)
+            return 1 if missing else 0
+        for p in (paths.iter_prefix(args.prefix) if args.prefix else paths):
+            print(p)
+    return 0
+
+
+def cmd_diff(args) -> int:
+    import json
+    import contextlib
+    from .dbdiff import diff_databases
+
+    for path in (args.old, args.new):
+        if not os.path.isfile(path):
+            print(f'Error: {path} not exist!', file=sys.stderr)
+            return 2
+    stats = _stats('compdb_diff', args.stats is not None)
+    try:
+        result = diff_databases(args.old, args.new, stats=stats)
+    except (ValueError, KeyError, TypeError, OSError) as e:  # a broken database is an error, not a change
+        print(f'Error: {type(e).__name__}: {e}', file=sys.stderr)
+        return 2
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as fd:
+            print(text, file=fd)
+    else:
+        print(text)
+    with contextlib.redirect_stdout(sys.stderr):  # keep stdout JSON only
+        stats.dump(args.stats)
+    return 1 if (result['added'] or result['removed'] or result['changed']) else 0
+
+
+def cmd_daemon(args) -> int:
+    from .daemon import DEFAULT_SOCKET, DatabaseState, Daemon, request
+
+    if args.mode == 'serve':
+        if not os.path.isfile(args.input):
+            print(f'Error: {args.input} not exist!')
+            return 1
+        stats = _stats('compdb_daemon', args.stats)
+        state = DatabaseState(args.input, d_root=args.d_root, ninja_root=args.ninja_root, stats=stats)
+        state.load_all()
+        print(f'loaded: {state.status()}')
+        socket_path = args.socket or os.path.join(os.path.dirname(state.ccfile), DEFAULT_SOCKET)
+        Daemon(state, socket_path, poll_interval=args.poll, use_inotify=not args.no_inotify).serve_forever()
+        return 0
+
+    import json
+    import errno
+    kwargs = {}
+    if args.output:
+        kwargs['output'] = os.path.abspath(args.output)
+    try:
+        res = request(args.socket or DEFAULT_SOCKET, args.cmd, **kwargs)
+    except OSError as e:
+        if e.errno in (errno.ENOENT, errno.ECONNREFUSED):
+            print(f'Error: no daemon listening on {args.socket or DEFAULT_SOCKET}')
+            return 1
+        raise
+    if not res.get('ok'):
+        print('Error:', res.get('error'))
+        return 1
+    result = res['result']
+    if args.cmd == 'files':
+        print('\n'.join(result))
+    elif args.cmd == 'macros':
+        for macro, cnt in result:
+            print(f'{macro}\t\t{cnt}')
+    else:
+        print(json.dumps(result, indent=2) if isinstance(result, dict) else result)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='json2cmakelists',
+                                     description='Tools around the JSON Compilation Database compile_commands.json')
+    sub = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    p = sub.add_parser('cmake', help='convert compile_commands.json to CMakeLists.txt or build.ninja (default)')
+    p.add_argument('-i', '--input', type=str, default='compile_commands.json',
+                   help='JSON Compilation Database file. [default: compile_commands.json]')
+    p.add_argument('-o', '--output', type=str, default=None,
+                   help='output file. [default: CMakeLists.txt, or build.ninja with `-b ninja`]')
+    p.add_argument('-b', '--backend', type=str, choices=['cmake', 'ninja'], default='cmake',
+                   help='write CMakeLists.txt, or a build.ninja that needs no configure step. [default: cmake]')
+    p.add_argument('--keep-duplicates', action='store_true',
+                   help='one target per entry even for exact duplicates. [default: drop them]')
+    p.add_argument('--duplicates-report', type=str, default=None, metavar='FILE',
+                   help='write the removed duplicates and the variant targets as JSON')
+    g = p.add_argument_group('precompiled headers and unity builds',
+                             'one target per flag set instead of one per entry. any --deps-* option implies --group')
+    g.add_argument('--group', action='store_true', help='group entries by flags')
+    g.add_argument('--deps-d', type=str, default=None, metavar='DIR', help='folder of *.d rule files')
+    g.add_argument('--deps-ninja', type=str, default=None, metavar='DIR', help='ninja build folder with .ninja_deps')
+    g.add_argument('--deps-results', type=str, nargs='+', default=None, metavar='FILE',
+                   help='`compiler-deps --shard` result files')
+    g.add_argument('--pch-max', type=int, default=10, help='precompiled headers per target, 0 for none. [default: 10]')
+    g.add_argument('--pch-min-share', type=float, default=1.0,
+                   help="share of a target's TUs that must include a header to precompile it. [default: 1.0]")
+    g.add_argument('--unity-batch', type=int, default=8, help='UNITY_BUILD_BATCH_SIZE, 0 for none. [default: 8]')
+    g.add_argument('--report', type=str, default=None, metavar='FILE',
+                   help='write the recommendations and estimated savings as JSON. [default: print a summary]')
+    _add_common(p)
+    p.set_defaults(func=cmd_cmake)
+
+    desc = r"""
+get all src and included files, by adding `-MM` options to compiler and parse the output.
+Supported compilers: gcc/g++, clang/clang++
+"""
+    p = sub.add_parser('compiler-deps', help='list sources, headers and definitions by running the compiler with -MM',
+                       description=desc, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('input', type=str, default='compile_commands.json', nargs='?',
+                   help='path to {0}. [default: {0}]'.format('compile_commands.json'))
+    p.add_argument('--paths', type=str, choices=['unique', 'full'], default='unique',
+                   help='control if the output content paths can be duplicated. [default: unique]')
+    p.add_argument('--no-compact-paths', action='store_true',
+                   help='insert an empty line between path groups in content.')
+    p.add_argument('--path-style', type=str, choices=['absolute', 'relative'], default='absolute',
+                   help="the style file's path in content. [default: absolute]. (NOT implemented)")
+    _add_format(p)
+    _add_filter(p, 'only scan the entries, and list the includes, under DIR. repeatable. [default: all]')
+    p.add_argument('--shard', type=str, default=None, metavar='i/N',
+                   help='scan only shard i of N (hash of directory+file) and write mergeable partial results.')
+    p.add_argument('--shard-output', type=str, default=None, metavar='FILE',
+                   help='partial results file. [default: <input stem>-shard-i-of-N.jsonl beside input]')
+    p.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                   help='run N compilers at once. [default: 1]')
+    p.add_argument('--timeout', type=float, default=None, metavar='SECONDS',
+                   help='kill a compiler running longer, and retry or report it. [default: no limit]')
+    p.add_argument('--retries', type=int, default=0, metavar='N',
+                   help='run a failed or killed compiler up to N more times. [default: 0]')
+    p.add_argument('--retry-delay', type=float, default=1.0, metavar='SECONDS',
+                   help='wait before the first retry, doubled for each next one. [default: 1]')
+    p.add_argument('--resume', action='store_true',
+                   help='keep the results of an interrupted or partly failed run in <input stem>-scan.jsonl '
+                        '(<shard output stem>-scan.jsonl with --shard) and compile the other entries only.')
+    _add_common(p)
+    p.set_defaults(func=cmd_compiler_deps)
+
+    p = sub.add_parser('compiler-deps-merge', help='merge `compiler-deps --shard` results into the usual outputs')
+    p.add_argument('shards', type=str, nargs='+', help='partial results files, one per shard')
+    p.add_argument('-i', '--input', type=str, default='compile_commands.json',
+                   help='the sharded {0}, names the outputs. [default: {0}]'.format('compile_commands.json'))
+    p.add_argument('--paths', type=str, choices=['unique', 'full'], default='unique',
+                   help='control if the output content paths can be duplicated. [default: unique]')
+    p.add_argument('--no-compact-paths', action='store_true',
+                   help='insert an empty line between path groups in content.')
+    _add_common(p)
+    _add_format(p)
+    p.set_defaults(func=cmd_compiler_deps_merge)
+
+    p = sub.add_parser('ninja-deps', help='list sources and macros from compile_commands.json, headers from .ninja_deps',
+                       description='Get all built sources and macros from cmake build databases')
+    p.add_argument('cmakebuild_root', type=str, help='root folder of cmake build')
+    p.add_argument('sourcetree_root', default='.', nargs='?', type=str, help='root folder of source tree')
+    p.add_argument('-p', '--output_prefix', type=str, default='output_compilecommands_', help="result filename's prefix")
+    p.add_argument('-a', '--all', action='store_true', help='all files including system files')
+    p.add_argument('--ninja', type=str, default=None, help='path to ninja. [default: from PATH]')
+    _add_memory_limit(p)
+    _add_format(p)
+    _add_filter(p, 'also list the includes under DIR, besides sourcetree_root. repeatable')
+    _add_common(p)
+    p.set_defaults(func=cmd_ninja_deps)
+
+    p = sub.add_parser('make-deps', help='list dependencies from *.d rule files',
+                       description='Get all dependencies from *.d rule files')
+    p.add_argument('sourcetree_root', default='.', nargs='?', type=str, help='root folder of source tree')
+    p.add_argument('-o', '--output', type=str, default='output_d_dependencies.txt', help='result output file')
+    _add_memory_limit(p)
+    _add_format(p)
+    _add_filter(p, 'only list the dependencies under DIR. repeatable. [default: all]')
+    _add_common(p)
+    p.set_defaults(func=cmd_make_deps)
+
+    p = sub.add_parser('arg2cmd', help='convert `arguments` entries to `command` form')
+    p.add_argument('input', type=str, default='compile_commands.json', nargs='?',
+                   help='path to {0}. [default: {0}]'.format('compile_commands.json'))
+    p.set_defaults(func=cmd_arg2cmd)
+
+    p = sub.add_parser('pathlist', help='create, list or query binary path lists (--format binary)')
+    psub = p.add_subparsers(dest='mode', required=True)
+    pp = psub.add_parser('pack', help='convert a text file list, sorted and deduplicated')
+    pp.add_argument('input', type=str, help='text file list, one path per line')
+    pp.add_argument('-o', '--output', type=str, default=None, help='output file. [default: input as *.pathlist]')
+    pp.add_argument('--block-size', type=int, default=64, help='paths per block. [default: 64]')
+    _add_memory_limit(pp)
+    pp.add_argument('-y', '--yes', action='store_true', help='overwrite existing outputs without asking')
+    pc = psub.add_parser('cat', help='print the paths')
+    pc.add_argument('input', type=str, help='binary path list')
+    pc.add_argument('--prefix', type=str, default=None, help='only the paths starting with it')
+    ph = psub.add_parser('has', help='print the given paths which are missing, exit 1 if any')
+    ph.add_argument('input', type=str, help='binary path list')
+    ph.add_argument('paths', type=str, nargs='+')
+    p.set_defaults(func=cmd_pathlist)
+
+    p = sub.add_parser('diff', help='files added, removed or with changed flags between two databases',
+                       description='Compare two compile_commands.json. Prints JSON, exits 0 when no file '
+                                   'changed, 1 when some did, 2 on errors')
+    p.add_argument('old', type=str, help='previous compile_commands.json')
+    p.add_argument('new', type=str, help='current compile_commands.json')
+    p.add_argument('-o', '--output', type=str, default=None, help='write the JSON here. [default: stdout]')
+    p.add_argument('--stats', '--profile', type=str, default=None, metavar='FILE',
+                   help='write per-phase timing and counters as JSON to FILE')
+    p.set_defaults(func=cmd_diff)
+
+    p = sub.add_parser('daemon', help='keep a database resident and serve requests over a unix socket')
+    dsub = p.add_subparsers(dest='mode', required=True)
+    ps = dsub.add_parser('serve', help='run the daemon')
+    ps.add_argument('-i', '--input', type=str, default='compile_commands.json', help='compile_commands.json to watch')
+    ps.add_argument('--d-root', type=str, default=None, help='folder to watch for *.d rule files')
+    ps.add_argument('--ninja-root', type=str, default=None, help='build folder with .ninja_deps to watch')
+    ps.add_argument('-s', '--socket', type=str, default=None, help='socket path. [default: beside input]')
+    ps.add_argument('--poll', type=float, default=1.0, help='polling interval in seconds. [default: 1.0]')
+    ps.add_argument('--no-inotify', action='store_true', help='always poll for changes')
+    ps.add_argument('--stats', action='store_true', help='collect timing and counters, returned by `status`')
+    pr = dsub.add_parser('request', help='send one request to a running daemon')
+    pr.add_argument('cmd', type=str, choices=['ping', 'status', 'files', 'macros', 'regenerate', 'shutdown'])
+    pr.add_argument('-s', '--socket', type=str, default=None, help='socket path. [default: ./.json2cmakelists.sock]')
+    pr.add_argument('-o', '--output', type=str, default=None, help='output file of `regenerate`')
+    p.set_defaults(func=cmd_daemon)
+
+    return parser
+
+
+def main(argv: list = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv = ['cmake'] + list(argv)  # `json2cmakelists -i x -o y` as before
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,734 @@
+"""
+get all src and included files by adding `-MM` to each compiler command and parsing its output.
+Supported compilers: gcc/g++, clang/clang++
+"""
+import os
+import re
+import shlex
+
+from .stats import NOSTATS
+from .pathfilter import KEEP_ALL
+
+
+_MACRO_NAME = re.compile(r'[A-Za-z_]\w*')
+
+
+def loadCompilecommandsJson(jsonfile: str) -> list:
+    import json
+    with open(jsonfile, encoding='utf-8') as fd:
+        js = json.load(fd)
+    return js
+
+
+def changeCompilerCommand(cmdline):
+    """
+    delete -o, add -MM
+    """
+    if isinstance(cmdline, (list, tuple)):
+        arguments = list(cmdline)  # type: list
+    elif isinstance(cmdline, str):
+        arguments = shlex.split(cmdline)
+    else:
+        raise Exception("unknown command")
+
+    # find -o, erase it
+    o_idx = -1
+    o_cnt = 0
+    for i, a in enumerate(arguments):
+        if a == '-o':
+            o_idx = i
+            o_cnt += 1
+    if o_cnt > 1:
+        raise Exception('multi -o found: {}'.format(cmdline))
+    if o_idx >= 0:
+        assert o_idx != 0, '-o at the head of: {}'.format(cmdline)
+        arguments[o_idx] = ''
+        arguments[o_idx + 1] = ''
+
+    # add -MM
+    arguments.insert(1, '-MM')
+    arguments = list(filter(lambda p: p.strip(), arguments))
+
+    cmdline2 = shlex.join(arguments)  # type:str
+    return cmdline2, arguments
+
+
+def getDefinitionFromArguments(argument: list):
+    """
+    get define from -Dxxx
+
+    :param argument:
+    :return: ['xxx', 'xxx=yyy']
+    """
+    defines = []
+    i, arg_len = 0, len(argument)
+    while i < arg_len:
+        a = argument[i].strip()  # type:str
+        """
+        cases:
+            -Dxxx
+            -D xxx
+            -Dxxx=yyy
+            -D xxx=yyy
+            -D xxx = yyy  # TODO:is this case exists?
+        """
+        d = None
+        if a == '-D':
+            i += 1
+            d = argument[i].strip()
+        elif a.startswith('-D'):
+            d = a[2:]
+
+        if d:
+            defines.append(d)
+        i += 1
+    return defines
+
+
+def split_definition(define: str) -> tuple:
+    """
+    'xxx=yyy' -> ('xxx', 'yyy'), 'xxx' -> ('xxx', '1') as the compiler defines it,
+    'f(a)=a' -> ('f', '(a)=a').
+    """
+    m = _MACRO_NAME.match(define)
+    name = m.group(0) if m else define
+    rest = define[len(name):]
+    if not rest:
+        return name, '1'
+    return name, rest[1:] if rest[0] == '=' else rest
+
+
+class DefinitionIndex(object):
+    """
+    the -D's of many entries in first-seen order with their counts, and for each macro
+    the entries defining each of its values, to find conflicts: one macro defined to
+    different values by different entries.
+
+    entries are numbered in the order they are added; the entries of a value are kept as
+    [first, last] ranges, so a macro every entry defines costs one range.
+    """
+
+    def __init__(self):
+        self.counts = {}  # type:dict[str, int]  # define -> occurrences, insertion ordered
+        self._values = {}  # type:dict[str, dict[str, list[list[int]]]]  # name -> value -> entry ranges
+        self._ranges = {}  # type:dict[str, list[list[int]]]  # define -> its entry ranges in _values
+        self.files = []  # type:list[str]
+
+    def add(self, file: str, defines: list):
+        index = len(self.files)
+        self.files.append(file)
+        counts = self.counts
+        for d in defines:
+            n = counts.get(d)
+            if n is None:
+                counts[d] = 1
+                name, value = split_definition(d)
+                ranges = self._ranges[d] = self._values.setdefault(name, {}).setdefault(value, [])
+            else:
+                counts[d] = n + 1
+                ranges = self._ranges[d]
+            if ranges and ranges[-1][1] >= index - 1:
+                ranges[-1][1] = index
+            else:
+                ranges.append([index, index])
+
+    def definitions(self) -> list:
+        """
+        unique defines, in the order first seen.
+        """
+        return list(self.counts)
+
+    def _files(self, ranges: list) -> list:
+        return [self.files[i] for first, last in ranges for i in range(first, last + 1)]
+
+    def conflicts(self) -> dict:
+        """
+        {macro: [{'value': str, 'count': entries, 'files': [...]}]} for the macros with
+        several values, values by descending count.
+        """
+        out = {}
+        for name, values in self._values.items():
+            if len(values) < 2:
+                continue
+            variants = [{'value': v, 'count': sum(last - first + 1 for first, last in ranges),
+                         'files': self._files(ranges)} for v, ranges in values.items()]
+            variants.sort(key=lambda x: -x['count'])
+            out[name] = variants
+        return out
+
+
+def conflicts_name(output_definition: str) -> str:
+    """
+    'x-definition.txt' -> 'x-definition-conflicts.json'
+    """
+    return os.path.splitext(output_definition)[0] + '-conflicts.json'
+
+
+def runCmd(cmdline: str, env: dict = None, cwd: str = None) -> str:
+    import subprocess
+    cp = None
+    if env and len(env):
+        cp = subprocess.run(cmdline, shell=True, check=True, capture_output=True, text=True, env=env, cwd=cwd)
+    else:
+        cp = subprocess.run(cmdline, shell=True, check=True, capture_output=True, text=True, cwd=cwd)
+    return cp.stdout
+
+
+def extractFilesFromMakeRule(rule: str) -> dict:
+    """
+    make's rule -> dict
+    """
+    dic = {
+        'target':  '',
+        'src':     '',
+        'include': []
+    }
+
+    assert rule.count(':') == 1, rule
+
+    colon = rule.find(':')
+    target = rule[:colon].strip()
+    others = rule[colon + 1:].strip()
+
+    parts = shlex.split(others)  # split file lists
+    parts = list(filter(lambda f: len(f), map(lambda p: p.strip(), parts)))
+
+    dic['target'] = target
+    dic['src'] = parts[0]  # FIXME: is the 1st file really the source code?
+    dic['include'] = parts[1:]
+    return dic
+
+
+class MakeRuleParser(object):
+    """
+    extractFilesFromMakeRule() fed one line at a time, as the compiler prints the rule.
+    """
+
+    def __init__(self):
+        self.target = None  # type:str
+        self.parts = []  # type:list[str]
+
+    def feed(self, line: str):
+        line = line.rstrip('\r\n')
+        if line.endswith('\\'):
+            line = line[:-1]  # continued on the next line
+        if self.target is None:
+            if not line.strip():
+                return
+            if line.count(':') != 1:
+                raise ValueError(f'not a make rule: {line}')
+            colon = line.find(':')
+            self.target = line[:colon].strip()
+            line = line[colon + 1:]
+        elif ':' in line:
+            raise ValueError(f'more than one make rule: {line}')
+        self.parts.extend(p for p in map(str.strip, shlex.split(line)) if p)
+
+    def result(self) -> dict:
+        if self.target is None or not self.parts:
+            raise ValueError('no make rule in compiler output')
+        return {'target': self.target, 'src': self.parts[0], 'include': self.parts[1:]}
+
+
+def _entry_key(dic: dict) -> tuple:
+    cmd = dic.get('command') or tuple(dic.get('arguments') or ())
+    return dic['directory'], dic['file'], cmd
+
+
+def iter_compiler_deps(js: list, cwd: str, stats=NOSTATS, path_filter=KEEP_ALL, jobs: int = 1,
+                       timeout: float = None, retries: int = 0, retry_delay: float = 1.0, failures: list = None):
+    """
+    run the compiler of each entry with `-MM`, yield one dict per entry, in database order:
+      {'file': str, 'defines': list[str], 'srcs': list[str], 'includes': list[str]}
+    paths are absolute. the process working directory is left untouched.
+    the entries are compiled with _scan() before the first result is yielded.
+
+    :param js: loaded compile_commands.json
+    :param cwd: absolute folder which relative `directory` values are resolved against
+    :param path_filter: entries whose source it drops are not compiled and yield empty lists,
+                        includes it drops are skipped
+    :param failures: if given, the failed entries are appended to it, as mainImpl() reports them.
+                     a failed entry yields its source only
+    """
+    import tempfile
+    fd_tmp, output_scan = tempfile.mkstemp(prefix='json2cmakelists-', suffix='-scan.jsonl')
+    os.close(fd_tmp)
+    try:
+        results, failed = _scan(list(enumerate(js)), cwd, output_scan, {}, jobs=jobs, timeout=timeout,
+                                retries=retries, retry_delay=retry_delay, stats=stats, path_filter=path_filter)
+        if failures is not None:
+            failures.extend(sorted(failed, key=lambda x: x['index']))
+        with open(output_scan, mode='rb') as fd_scan:
+            for _, res in results(fd_scan):
+                yield res
+    finally:
+        os.remove(output_scan)
+
+
+def _entry_paths(dic: dict, cwd: str) -> tuple:
+    """
+    absolute (directory, file) of an entry.
+    """
+    cur_dir = dic['directory']
+    cur_fil = dic['file']
+
+    # respect to current command and directory
+    if not os.path.isabs(cur_dir):
+        cur_dir = os.path.abspath(os.path.join(cwd, cur_dir))
+    if not os.path.isabs(cur_fil):
+        cur_fil = os.path.abspath(os.path.join(cur_dir, cur_fil))
+    return cur_dir, cur_fil
+
+
+def _prepare_entry(dic: dict, cwd: str, stats=NOSTATS, path_filter=KEEP_ALL):
+    """
+    the -MM command of an entry: {'file', 'directory', 'cmdline', 'defines'} with absolute paths,
+    None when path_filter drops its source.
+    """
+    cur_dir, cur_fil = _entry_paths(dic, cwd)
+    cur_cmd = dic.get('command')  # type: str
+    if not cur_cmd:
+        cur_cmd = dic.get('arguments')  # type: list
+
+    if path_filter and not path_filter(cur_fil):
+        return None
+    if not (os.path.exists(cur_dir) and os.path.exists(cur_fil)):
+        raise FileNotFoundError(f"{cur_dir} or {cur_fil} not exist!")
+    # if cur_fil.find('\\') >= 0:
+    #     print('Warning: \\ found in path, result maybe incorrect: {}'.format(cur_fil))
+
+    # tweak command line
+    with stats.phase('tokenize'):
+        cmdline, argument = changeCompilerCommand(cur_cmd)
+    stats.distinct('flag_sets', tuple(a for a in argument if a != dic['file']))
+
+    # definitions
+    with stats.phase('classify'):
+        defines = getDefinitionFromArguments(argument)
+    return {'file': cur_fil, 'directory': cur_dir, 'cmdline': cmdline, 'defines': defines}
+
+
+def _entry_result(job: dict, rule_dic: dict, path_filter=KEEP_ALL) -> dict:
+    """
+    the iter_compiler_deps() result of a _prepare_entry() job, from its parsed make rule.
+    """
+    cur_dir = job['directory']
+    cur_fil = job['file']
+    cur_fil_dir = os.path.dirname(cur_fil)
+
+    # get src and include files
+    srcs = [cur_fil, rule_dic['src']]
+    includes: list = rule_dic['include']
+
+    srcs = map(lambda s: s if os.path.isabs(s) else os.path.abspath(os.path.join(cur_dir, s)), srcs)
+    srcs = list(set(srcs))
+    if len(srcs) != 1:
+        raise ValueError('{} duplicated!'.format(srcs))  # the rule is not about this entry's source
+
+    if includes:
+        if path_filter:
+            includes = [h if os.path.isabs(h) else os.path.join(cur_fil_dir, h) for h in includes]
+            includes = [h for h in includes if path_filter(h)]
+        includes = list(map(lambda h: h if os.path.isabs(h) else os.path.abspath(os.path.join(cur_fil_dir, h)), includes))
+
+    return {'file': cur_fil, 'defines': job['defines'], 'srcs': srcs, 'includes': includes}
+
+
+def parse_shard_spec(spec: str) -> tuple:
+    """
+    'i/N' -> (i, N), 0 <= i < N
+    """
+    try:
+        shard, count = (int(x) for x in spec.split('/'))
+    except ValueError:
+        raise ValueError(f'bad shard spec, expect i/N: {spec}')
+    if not 0 <= shard < count:
+        raise ValueError(f'bad shard spec, expect 0 <= i < N: {spec}')
+    return shard, count
+
+
+def shard_of(dic: dict, count: int) -> int:
+    """
+    stable shard of an entry: depends on its directory, file and output only,
+    not on the database order or the python hash seed.
+    """
+    import hashlib
+    key = '\0'.join((dic['directory'], dic['file'], dic.get('output', '')))
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count
+
+
+def iter_shard(js: list, shard: int, count: int):
+    """
+    (index, entry) of the entries in this shard, in database order.
+    """
+    for index, dic in enumerate(js):
+        if shard_of(dic, count) == shard:
+            yield index, dic
+
+
+def shardImpl(cwd: str, cc_json_file: str, output_shard: str, shard: int, count: int, stats=NOSTATS,
+              path_filter=KEEP_ALL, output_scan: str = None, output_failures: str = None, jobs: int = 1,
+              timeout: float = None, retries: int = 0, retry_delay: float = 1.0, resume: bool = False) -> int:
+    """
+    scan one shard with _scan() and write its results as JSON lines: a header, then one
+    iter_compiler_deps() result per entry with its database `index`.
+    the file only appears under its name once complete.
+
+    :param output_scan: [default: <output_shard stem>-scan.jsonl]
+    :param output_failures: [default: <output_shard stem>-failures.json]
+    :return: number of failed entries, see mainImpl()
+    """
+    import json
+    import hashlib
+    stem = os.path.splitext(output_shard)[0]
+    output_scan = output_scan or stem + '-scan.jsonl'
+    output_failures = output_failures or stem + '-failures.json'
+
+    with stats.phase('load'):
+        with open(cc_json_file, mode='rb') as fd:
+            raw = fd.read()
+        js = json.loads(raw)
+    entries = list(iter_shard(js, shard, count))
+    stats.count('entries', len(entries))
+
+    header = {
+        'shard':    shard,
+        'count':    count,
+        'entries':  len(js),
+        'selected': len(entries),
+        'database': hashlib.sha256(raw).hexdigest(),
+    }
+    del raw, js
+    results, failures = _scan(entries, cwd, output_scan, header, resume=resume, jobs=jobs, timeout=timeout,
+                              retries=retries, retry_delay=retry_delay, stats=stats, path_filter=path_filter)
+    tmp = output_shard + '.part'
+    with open(tmp, mode='w', encoding='utf-8') as fd, open(output_scan, mode='rb') as fd_scan:
+        fd.write(json.dumps(header) + '\n')
+        for index, res in results(fd_scan):
+            res['index'] = index
+            fd.write(json.dumps(res) + '\n')
+    os.replace(tmp, output_shard)
+    _finish_scan(failures, output_scan, output_failures)
+    return len(failures)
+
+
+def _read_shard(path: str):
+    import json
+    fd = open(path, encoding='utf-8')
+    header = json.loads(fd.readline())
+
+    def records():
+        with fd:
+            for line in fd:
+                yield json.loads(line)
+    return header, records()
+
+
+def merge_shards(shard_files: list, output_filelist: str, output_definition: str,
+                 paths_unique: bool = True, paths_compact: bool = True, output_format: str = 'text',
+                 stats=NOSTATS):
+    """
+    combine the shards of one database into the same outputs a single mainImpl() run writes.
+    """
+    import heapq
+    headers = []
+    readers = []
+    for path in shard_files:
+        header, records = _read_shard(path)
+        headers.append(header)
+        readers.append(records)
+
+    if not headers:
+        raise Exception('no shard to merge')
+    count = headers[0]['count']
+    for h, path in zip(headers, shard_files):
+        if (h['count'], h['entries'], h['database']) != (count, headers[0]['entries'], headers[0]['database']):
+            raise Exception(f'{path} is not a shard of the same database and split')
+    shards = sorted(h['shard'] for h in headers)
+    if shards != list(range(count)):
+        raise Exception(f'shards {shards} given, expect 0..{count - 1} once each')
+    total = headers[0]['entries']
+    if sum(h['selected'] for h in headers) != total:
+        raise Exception('shards do not cover the database')
+
+    def merged():
+        expect = 0
+        for res in heapq.merge(*readers, key=lambda r: r['index']):
+            if res['index'] != expect:
+                raise Exception(f'entry {expect} missing in shards, incomplete scan?')
+            expect += 1
+            yield res
+        if expect != total:
+            raise Exception(f'entry {expect} missing in shards, incomplete scan?')
+
+    stats.count('entries', total)
+    write_compiler_deps(merged(), output_filelist, output_definition,
+                        paths_unique=paths_unique, paths_compact=paths_compact, total=total,
+                        output_format=output_format, stats=stats)
+
+
+def write_compiler_deps(results, output_filelist: str, output_definition: str,
+                        paths_unique: bool = True, paths_compact: bool = True, total: int = None,
+                        output_format: str = 'text', output_conflicts: str = None, progress: bool = True,
+                        stats=NOSTATS):
+    """
+    write the per-entry results of iter_compiler_deps(), in entry order.
+
+    :param total: number of entries, for the progress line
+    :param output_format: 'text', or 'binary' for all paths sorted in a path list, see pathlist.py
+    :param output_conflicts: JSON of the macros defined to different values, see DefinitionIndex.
+                             default conflicts_name(output_definition)
+    :param progress: print a line per entry
+    """
+    import json
+    import contextlib
+    from .extsort import ExternalSorter
+    exists = set()
+    extentions = set()  # file extension
+    definitions = DefinitionIndex()
+
+    binary = output_format == 'binary'
+    sorter = ExternalSorter(stats=stats) if binary else None
+    with contextlib.nullcontext() if binary else open(output_filelist, mode='w+', encoding='utf-8') as fd_f:
+        for ji, res in enumerate(results, start=1):
+            if progress:
+                print('{}/{}'.format(ji, total if total is not None else '?'))
+
+            # definitions
+            with stats.phase('classify'):
+                definitions.add(res['file'], res['defines'])
+
+            # write path of src and include files
+            with stats.phase('write'):
+                for f in res['srcs'] + res['includes']:
+                    stats.distinct('paths', f)
+                    ext = os.path.splitext(f)[-1]
+                    if ext:
+                        extentions.add(ext)
+
+                    if binary:
+                        sorter.add(f)
+                        continue
+                    if paths_unique:
+                        if f in exists:
+                            continue
+                        else:
+                            exists.add(f)
+                    # TODO: relative path
+                    print(f, file=fd_f)
+                if not paths_compact and not binary:
+                    print('', file=fd_f)  # empty line
+    if binary:
+        from .pathlist import write_pathlist
+        with stats.phase('write'), sorter:
+            write_pathlist(output_filelist, sorter.iter_sorted())
+    with stats.phase('classify'):
+        conflicts = definitions.conflicts()
+    with stats.phase('write'):
+        with open(output_definition, mode='w+', encoding='utf-8') as fd_d:
+            print('\n'.join(definitions.definitions()), file=fd_d)
+        with open(output_conflicts or conflicts_name(output_definition), mode='w', encoding='utf-8') as fd_c:
+            json.dump(conflicts, fd_c, indent=2)
+    stats.count('definitions', len(definitions.counts))
+    stats.count('definition_conflicts', len(conflicts))
+    if conflicts:
+        print('macros defined to different values: {}'.format(sorted(conflicts)))
+
+    print('all file extensions: {}'.format(sorted(extentions)))
+
+
+def _read_scan(path: str, header: dict) -> dict:
+    """
+    {index: file offset} of the results in a scan file of an interrupted _scan().
+    a record torn by the interruption is cut off.
+    """
+    import json
+    offsets = {}
+    with open(path, mode='r+b') as fd:
+        first = fd.readline()
+        try:
+            found = json.loads(first)
+        except ValueError:
+            found = None
+        if found != header:
+            raise Exception(f'{path} is the scan of another database, remove it or run without resume')
+        pos = fd.tell()
+        for line in fd:
+            try:
+                index = json.loads(line)['index'] if line.endswith(b'\n') else None
+            except ValueError:
+                index = None
+            if index is None:
+                fd.truncate(pos)
+                break
+            offsets[index] = pos
+            pos += len(line)
+    return offsets
+
+
+def _scan(entries: list, cwd: str, output_scan: str, header: dict, resume: bool = False, jobs: int = 1,
+          timeout: float = None, retries: int = 0, retry_delay: float = 1.0, stats=NOSTATS, path_filter=KEEP_ALL):
+    """
+    compile entries concurrently, see asyncrun.py. each result is appended to output_scan as it
+    completes, after the header line, so an interrupted scan can resume.
+    an entry whose compiler fails is listed in the failures, and in the results by its source only.
+
+    :param entries: [(database index, entry)]
+    :param resume: keep the results already in output_scan and compile the other entries only
+    :return: (results, failures). results(fd) yields (index, result) in the order of entries,
+             from output_scan opened as fd
+    """
+    import json
+    from .asyncrun import run_jobs
+
+    offsets = {}  # type:dict[int, int]  # entry index -> offset of its result in output_scan
+    if resume and os.path.exists(output_scan):
+        offsets = _read_scan(output_scan, header)
+        print(f'resume: {len(offsets)} results in {output_scan}')
+        stats.count('resumed_entries', len(offsets))
+    else:
+        with open(output_scan, mode='wb') as fd:
+            fd.write(json.dumps(header).encode('utf-8') + b'\n')
+
+    # entries repeated verbatim take the result of the first one
+    first = {}  # type:dict[tuple, int]
+    alias = []  # type:list[int]  # per entry, the index of the entry whose result it takes
+    filtered = set()
+    running = {}  # type:dict[int, dict]  # index -> _prepare_entry() job
+    failed = {}  # type:dict[int, dict]  # index -> result of a failed entry
+    failures = []
+    pending = []  # type:list[tuple]  # (index, cmdline, cwd) to run
+    for index, dic in entries:
+        index0 = first.setdefault(_entry_key(dic), index)
+        alias.append(index0)
+        if index0 != index:
+            stats.count('duplicate_entries')
+            continue
+        try:
+            job = _prepare_entry(dic, cwd, stats=stats, path_filter=path_filter)
+        except Exception as e:
+            file = _entry_paths(dic, cwd)[1]
+            failures.append({'index': index, 'file': file, 'directory': dic['directory'],
+                             'error': f'{type(e).__name__}: {e}', 'stderr': '', 'attempts': 0})
+            failed[index] = {'file': file, 'defines': [], 'srcs': [], 'includes': []}
+            continue
+        if job is None:
+            stats.count('filtered_entries')
+            filtered.add(index)
+            continue
+        if index in offsets:
+            continue
+        running[index] = job
+        pending.append((index, job['cmdline'], job['directory']))
+    done = 0
+
+    def progress():
+        nonlocal done
+        done += 1
+        print('{}/{}'.format(done, len(pending)))
+
+    with open(output_scan, mode='ab') as fd_scan:
+        def on_done(index: int, rule_dic: dict):
+            res = _entry_result(running[index], rule_dic, path_filter=path_filter)
+            del running[index]
+            res['index'] = index
+            offsets[index] = fd_scan.tell()
+            fd_scan.write(json.dumps(res).encode('utf-8') + b'\n')
+            fd_scan.flush()
+            progress()
+
+        def on_failed(index: int, failure: dict):
+            job = running.pop(index)
+            failures.append(dict({'index': index, 'file': job['file'], 'directory': job['directory'],
+                                  'command': job['cmdline']}, **failure))
+            failed[index] = {'file': job['file'], 'defines': job['defines'], 'srcs': [job['file']], 'includes': []}
+            print(f'{job["file"]}: {failure["error"]}')
+            progress()
+
+        with stats.phase('subprocess'):
+            run_jobs(pending, MakeRuleParser, on_done, on_failed, concurrency=jobs, timeout=timeout,
+                     retries=retries, retry_delay=retry_delay, stats=stats)
+
+    def results(fd):
+        for (index, dic), index0 in zip(entries, alias):
+            if index0 in filtered:
+                yield index, {'file': _entry_paths(dic, cwd)[1], 'defines': [], 'srcs': [], 'includes': []}
+            elif index0 in failed:
+                yield index, dict(failed[index0])
+            else:
+                fd.seek(offsets[index0])
+                res = json.loads(fd.readline())
+                del res['index']
+                yield index, res
+
+    return results, failures
+
+
+def _finish_scan(failures: list, output_scan: str, output_failures: str):
+    """
+    write the failures report, or remove the scan and a stale report once every entry succeeded.
+    """
+    import json
+    if failures:
+        failures.sort(key=lambda x: x['index'])
+        with open(output_failures, mode='w', encoding='utf-8') as fd:
+            json.dump(failures, fd, indent=2)
+        print(f'{len(failures)} entries failed, see {output_failures}. retry them with --resume')
+    else:
+        os.remove(output_scan)
+        if os.path.exists(output_failures):
+            os.remove(output_failures)
+
+
+def mainImpl(cwd: str, cc_json_file: str, output_filelist: str, output_definition: str,
+             paths_unique: bool = True, paths_compact: bool = True, path_abs: bool = True,
+             output_format: str = 'text', stats=NOSTATS, path_filter=KEEP_ALL,
+             output_scan: str = None, output_failures: str = None, jobs: int = 1, timeout: float = None,
+             retries: int = 0, retry_delay: float = 1.0, resume: bool = False) -> int:
+    """
+    compile the entries concurrently, see _scan(), and write the outputs in entry order at the end.
+
+    :param cwd: absolute folder of cc_json_file
+    :param cc_json_file:
+    :param output_filelist: output file for filelist
+    :param output_definition: output file for definition
+    :param paths_unique:
+    :param paths_compact:
+    :param path_abs:
+    :param output_format: 'text', or 'binary' for a sorted path list
+    :param stats: collector of per-phase timing and counters
+    :param path_filter: PathFilter of the sources to scan and the includes to list
+    :param output_scan: results as JSON lines, removed once every entry succeeded.
+                        [default: <cc_json_file stem>-scan.jsonl]
+    :param output_failures: JSON list of the failed entries, written when there are any.
+                            [default: <cc_json_file stem>-failures.json]
+    :param jobs: compilers running at once
+    :param timeout: seconds before a compiler is killed, None to wait forever
+    :param retries: runs of a failed compiler after the first, retry_delay seconds apart, doubled each time
+    :param resume: keep the results already in output_scan and compile the other entries only
+    :return: number of failed entries
+    """
+    import json
+    import hashlib
+    stem = os.path.splitext(cc_json_file)[0]
+    output_scan = output_scan or stem + '-scan.jsonl'
+    output_failures = output_failures or stem + '-failures.json'
+
+    with stats.phase('load'):
+        with open(cc_json_file, mode='rb') as fd:
+            raw = fd.read()
+        js = json.loads(raw)
+    stats.count('entries', len(js))
+    header = {'entries': len(js), 'database': hashlib.sha256(raw).hexdigest()}
+    del raw
+
+    results, failures = _scan(list(enumerate(js)), cwd, output_scan, header, resume=resume, jobs=jobs,
+                              timeout=timeout, retries=retries, retry_delay=retry_delay, stats=stats,
+                              path_filter=path_filter)
+    with open(output_scan, mode='rb') as fd:
+        write_compiler_deps((res for _, res in results(fd)), output_filelist, output_definition,
+                            paths_unique=paths_unique, paths_compact=paths_compact, total=len(js),
+                            output_format=output_format, progress=False, stats=stats)
+    _finish_scan(failures, output_scan, output_failures)
+    return len(failures)
@@ -0,0 +1,479 @@
+"""
+keep a compilation database resident and answer requests over a local unix socket.
+
+the daemon parses compile_commands.json, *.d files and `ninja -t deps` once,
+watches them (inotify on linux, polling elsewhere), re-classifies only the
+entries and rule files which changed, and serves:
+  ping, status, files, macros, regenerate, shutdown
+
+a request is one line of JSON, e.g. {"cmd": "regenerate", "output": "CMakeLists.txt"},
+the response is one line of JSON: {"ok": true, "result": ..., "elapsed_ms": ...}.
+"""
+import sys
+import os
+import json
+import time
+import socket
+import shutil
+import struct
+import selectors
+from pathlib import Path
+
+from .stats import NOSTATS
+from .translator import CompilationDatabaseTranslator
+from .ninjadeps import _normpath, _get_include_files_using_ninja, iter_macros
+from .makerules import filter_d_files, parse_d_file
+
+DEFAULT_SOCKET = '.json2cmakelists.sock'
+
+
+class _Inotify(object):
+    """
+    minimal inotify binding through ctypes, watches directories (files are often
+    replaced by rename, so a watch on the file itself would be lost).
+    """
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    OVERFLOW = '<overflow>'
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        self._ctypes = ctypes
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 fail')
+        self._dirs = {}  # type:dict[int, str]
+
+    def fileno(self):
+        return self._fd
+
+    def close(self):
+        os.close(self._fd)
+
+    def watch(self, directory: str):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            raise OSError(self._ctypes.get_errno(), f'inotify_add_watch fail: {directory}')
+        self._dirs[wd] = directory
+
+    def read(self) -> set:
+        """
+        paths changed since last read. new sub-directories are watched too.
+        """
+        changed = set()
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            i = 0
+            while i + 16 <= len(buf):
+                wd, mask, _cookie, length = struct.unpack_from('iIII', buf, i)
+                name = buf[i + 16:i + 16 + length].rstrip(b'\0')
+                i += 16 + length
+                if mask & self.IN_Q_OVERFLOW:
+                    changed.add(self.OVERFLOW)
+                    continue
+                directory = self._dirs.get(wd)
+                if directory is None:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name)) if name else directory
+                if (mask & self.IN_ISDIR) and (mask & (self.IN_CREATE | self.IN_MOVED_TO)):
+                    self.watch(path)
+                changed.add(path)
+        return changed
+
+
+class _Poller(object):
+    """
+    fallback watcher: compare mtimes of the known files on each tick, look for
+    new *.d files every `rescan_every` ticks.
+    """
+
+    def __init__(self, files_fn, rescan_fn, rescan_every: int = 10):
+        self._files_fn = files_fn
+        self._rescan_fn = rescan_fn
+        self._rescan_every = rescan_every
+        self._tick = 0
+        self._mtimes = {}  # type:dict[str, int]
+        self.changed()
+
+    @staticmethod
+    def _mtime(path: str):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def changed(self) -> set:
+        self._tick += 1
+        paths = set(self._files_fn())
+        if self._tick % self._rescan_every == 0:
+            paths |= set(self._rescan_fn())
+        paths |= set(self._mtimes)
+        changed = set()
+        for p in paths:
+            mt = self._mtime(p)
+            if self._mtimes.get(p) != mt:
+                changed.add(p)
+            if mt is None:
+                self._mtimes.pop(p, None)
+            else:
+                self._mtimes[p] = mt
+        return changed
+
+
+class _Entry(object):
+    """
+    one command object with its classification cached.
+    """
+    __slots__ = ('item', 'source', 'digest', 'macros', 'options', 'defines', 'include_I', 'include_isystem')
+
+
+class DatabaseState(object):
+    """
+    the resident state: classified entries keyed by their content, rule files
+    and ninja deps. every update touches only what changed.
+    """
+
+    def __init__(self, ccfile: str, d_root: str = None, ninja_root: str = None, stats=NOSTATS):
+        self.ccfile = os.path.abspath(ccfile)
+        self.d_root = os.path.abspath(d_root) if d_root else None
+        self.ninja_root = os.path.abspath(ninja_root) if ninja_root else None
+        self.stats = stats
+        self.translator = CompilationDatabaseTranslator(stats)
+        self.keys = []  # type:list[str]  # entry keys in database order
+        self.records = {}  # type:dict[str, _Entry]
+        self.d_deps = {}  # type:dict[str, set[str]]
+        self.ninja_deps = set()
+        self._orphans = set()  # type:set[str]  # rule files whose object file is not there yet
+        self._macros = None  # cache of macros(), dropped on change
+        self._files = None  # cache of files(), dropped on change
+
+    # --- updates ---
+
+    def _classify(self, item: dict) -> _Entry:
+        rec = _Entry()
+        rec.item = item
+        fil = item['file']
+        if not os.path.isabs(fil):
+            fil = os.path.join(item['directory'], fil)
+        rec.source = _normpath(fil)
+
+        tr = self.translator
+        rec.digest = tr.canonical_digest(item)
+        cmdvalue = tr.tokenize_entry(item)
+        rec.macros = list(iter_macros(cmdvalue))
+        tr.classify_entry(item, cmdvalue)
+        rec.options = tr.target_options
+        rec.defines = tr.target_defines
+        rec.include_I = tr.target_include_I
+        rec.include_isystem = tr.target_include_isystem
+        return rec
+
+    def reload_compile_commands(self) -> dict:
+        """
+        re-read the database; entries whose content did not change keep their classification.
+        """
+        with self.stats.phase('load'):
+            with open(self.ccfile, encoding='utf-8') as fd:
+                js = json.load(fd)
+        keys = []
+        records = {}
+        added = 0
+        with self.stats.phase('classify'):
+            for item in js:
+                key = json.dumps(item, sort_keys=True)
+                rec = records.get(key) or self.records.get(key)
+                if rec is None:
+                    rec = self._classify(item)
+                    added += 1
+                records[key] = rec
+                keys.append(key)
+        removed = sum(1 for k in self.records if k not in records)
+        self.keys, self.records = keys, records
+        self._macros = None
+        self._files = None
+        self.stats.count('entries_classified', added)
+        return {'entries': len(keys), 'classified': added, 'dropped': removed}
+
+    def scan_d_files(self) -> list:
+        if not self.d_root:
+            return []
+        return [str(p) for p in Path(self.d_root).rglob('*.d')]
+
+    def update_d_file(self, dfile: str):
+        self._files = None
+        self._orphans.discard(dfile)
+        if not os.path.exists(dfile):
+            self.d_deps.pop(dfile, None)
+            return
+        if not filter_d_files([Path(dfile)]):  # checked again when a sibling shows up
+            self.d_deps.pop(dfile, None)
+            self._orphans.add(dfile)
+            return
+        with self.stats.phase('parse'):
+            td = parse_d_file(Path(dfile))
+        deps = set()
+        for d in td.values():
+            deps |= set(d)
+        self.d_deps[dfile] = deps
+
+    def reload_ninja_deps(self):
+        if not self.ninja_root or not shutil.which('ninja'):
+            return
+        self._files = None
+        if not os.path.exists(os.path.join(self.ninja_root, '.ninja_deps')):
+            self.ninja_deps = set()
+            return
+        with self.stats.phase('subprocess'):
+            self.ninja_deps = set(_get_include_files_using_ninja(self.ninja_root))
+
+    def load_all(self):
+        self.reload_compile_commands()
+        for dfile in self.scan_d_files():
+            self.update_d_file(dfile)
+        self.reload_ninja_deps()
+
+    def apply_changes(self, paths: set) -> list:
+        """
+        :return: what was updated, for logging
+        """
+        done = []
+        if _Inotify.OVERFLOW in paths:
+            self.load_all()
+            return ['all']
+        for p in sorted(paths):
+            if p == self.ccfile:
+                try:
+                    done.append(('compile_commands', self.reload_compile_commands()))
+                except ValueError as e:  # half written, wait for the next event
+                    print(f'!!!reload {p}: {e}')
+            elif self.d_root and p.endswith('.d') and p.startswith(self.d_root):
+                self.update_d_file(p)
+                done.append(('d', p))
+            elif self.ninja_root and p == os.path.join(self.ninja_root, '.ninja_deps'):
+                self.reload_ninja_deps()
+                done.append(('ninja_deps', p))
+            elif self.d_root and p.startswith(self.d_root) and os.path.isdir(p):
+                for dfile in Path(p).rglob('*.d'):
+                    self.update_d_file(str(dfile))
+                done.append(('dir', p))
+            elif self.d_root and p.startswith(self.d_root):
+                # x.o written after x.d: the rule file was an orphan until now
+                dfile = os.path.splitext(p)[0] + '.d'
+                if dfile in self._orphans or dfile in self.d_deps:
+                    self.update_d_file(dfile)
+                    done.append(('d', dfile))
+        return done
+
+    def watched_files(self) -> list:
+        files = [self.ccfile] + list(self.d_deps)
+        files += sorted({os.path.dirname(d) for d in self._orphans})  # a new sibling changes the mtime
+        if self.ninja_root:
+            files.append(os.path.join(self.ninja_root, '.ninja_deps'))
+        return files
+
+    def watched_dirs(self) -> list:
+        dirs = {os.path.dirname(self.ccfile)}
+        if self.ninja_root:
+            dirs.add(self.ninja_root)
+        if self.d_root:
+            for d, _subdirs, _files in os.walk(self.d_root):
+                dirs.add(d)
+        return sorted(dirs)
+
+    # --- queries ---
+
+    def files(self) -> list:
+        """
+        sources in database order, then the sorted dependencies which are not sources.
+        """
+        if self._files is not None:
+            return self._files
+        sources = []
+        seen = set()
+        for key in self.keys:
+            src = self.records[key].source
+            if src not in seen:
+                seen.add(src)
+                sources.append(src)
+        deps = set(self.ninja_deps)
+        for d in self.d_deps.values():
+            deps |= d
+        self._files = sources + sorted(deps - seen)
+        return self._files
+
+    def macros(self) -> list:
+        """
+        [(macro, count)], most used first, as get_compile_files_compilecommandsjson.py writes them.
+        """
+        if self._macros is None:
+            counts = {}  # type:dict[str, int]
+            for key in self.keys:
+                for m in self.records[key].macros:
+                    counts[m] = counts.get(m, 0) + 1
+            self._macros = sorted(counts.items(), key=lambda x: -x[1])
+        return self._macros
+
+    def write_cmakelists(self, fd):
+        """
+        as `json2cmakelists cmake` writes it: duplicates dropped, variants named,
+        see CompilationDatabaseTranslator.remove_duplicates().
+        """
+        tr = self.translator
+        kept = []  # type:list[_Entry]
+        seen = set()
+        by_source = {}  # type:dict[str, list[int]]
+        for key in self.keys:
+            rec = self.records[key]
+            if (rec.source, rec.digest) in seen:
+                continue
+            seen.add((rec.source, rec.digest))
+            by_source.setdefault(rec.source, []).append(len(kept))
+            kept.append(rec)
+        tr.variant_of = {}
+        for positions in by_source.values():
+            if len(positions) > 1:
+                for n, pos in enumerate(positions, start=1):
+                    tr.variant_of[pos] = n
+
+        tr.write_cmake_header(fd)
+        for seq_num, rec in enumerate(kept, start=1):
+            tr.target_options = rec.options
+            tr.target_defines = rec.defines
+            tr.target_include_I = rec.include_I
+            tr.target_include_isystem = rec.include_isystem
+            tr.write_cmake_target(fd, seq_num, rec.item)
+            fd.write('\n')
+
+    def status(self) -> dict:
+        return {
+            'compile_commands': self.ccfile,
+            'entries':          len(self.keys),
+            'distinct_entries': len(self.records),
+            'd_files':          len(self.d_deps),
+            'ninja_deps':       len(self.ninja_deps),
+        }
+
+
+class Daemon(object):
+    def __init__(self, state: DatabaseState, socket_path: str, poll_interval: float = 1.0,
+                 use_inotify: bool = True):
+        self.state = state
+        self.socket_path = os.path.abspath(socket_path)
+        self.poll_interval = poll_interval
+        self.running = False
+        self._inotify = None
+        self._poller = None
+        if use_inotify and sys.platform.startswith('linux'):
+            try:
+                self._inotify = _Inotify()
+            except OSError as e:
+                print(f'inotify unavailable, polling instead: {e}')
+        if self._inotify is None:
+            self._poller = _Poller(state.watched_files, state.scan_d_files)
+
+    def _handle(self, req: dict):
+        cmd = req.get('cmd')
+        st = self.state
+        if cmd == 'ping':
+            return 'pong'
+        elif cmd == 'status':
+            res = st.status()
+            res['stats'] = st.stats.report() if st.stats.enabled else None
+            return res
+        elif cmd == 'files':
+            return st.files()
+        elif cmd == 'macros':
+            return st.macros()
+        elif cmd == 'regenerate':
+            output = req.get('output') or os.path.join(os.path.dirname(st.ccfile), 'CMakeLists.txt')
+            with st.stats.phase('write'):
+                with open(output, mode='w', encoding='utf-8') as fd:
+                    st.write_cmakelists(fd)
+            return output
+        elif cmd == 'shutdown':
+            self.running = False
+            return 'bye'
+        raise ValueError(f'unknown cmd: {cmd}')
+
+    def _serve_client(self, conn: socket.socket):
+        t0 = time.perf_counter()
+        try:
+            conn.settimeout(5)
+            with conn.makefile('rb') as rfd:
+                line = rfd.readline()
+            try:
+                res = {'ok': True, 'result': self._handle(json.loads(line))}
+            except Exception as e:
+                res = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+            res['elapsed_ms'] = (time.perf_counter() - t0) * 1000.0
+            conn.sendall(json.dumps(res).encode('utf-8') + b'\n')
+        except OSError as e:
+            print('!!!client:', type(e), e)
+        finally:
+            conn.close()
+
+    def _apply(self, paths: set):
+        if not paths:
+            return
+        for what in self.state.apply_changes(paths):
+            print('updated:', what)
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # stale socket from a previous run
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        server.listen(16)
+
+        sel = selectors.DefaultSelector()
+        sel.register(server, selectors.EVENT_READ, 'server')
+        if self._inotify:
+            for d in self.state.watched_dirs():
+                self._inotify.watch(d)
+            sel.register(self._inotify, selectors.EVENT_READ, 'inotify')
+        print(f'listening: {self.socket_path} ({"inotify" if self._inotify else "polling"})')
+
+        self.running = True
+        try:
+            while self.running:
+                for key, _ in sel.select(timeout=self.poll_interval):
+                    if key.data == 'server':
+                        conn, _ = server.accept()
+                        self._serve_client(conn)
+                    elif key.data == 'inotify':
+                        self._apply(self._inotify.read())
+                if self._poller:
+                    self._apply(self._poller.changed())
+        finally:
+            sel.close()
+            server.close()
+            if self._inotify:
+                self._inotify.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+def request(socket_path: str, cmd: str, **kwargs) -> dict:
+    """
+    send one request to a running daemon and return its response.
+    """
+    req = dict(kwargs, cmd=cmd)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(req).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as rfd:
+            return json.loads(rfd.readline())
+
@@ -0,0 +1,118 @@
+"""
+which files were added, removed, or compiled with other flags between two compile_commands.json.
+
+each entry is reduced to a digest of its canonical form: directory and the arguments as
+CompilationDatabaseTranslator tokenizes them, without the source, `-o` and `-c`.
+so a moved object file or a reordered database is no change, a new `-D` is.
+each database is read in one streaming pass, holding only digests.
+"""
+import os
+import json
+
+from .stats import NOSTATS
+
+
+def iter_json_array(fd, chunk_size: int = 1 << 20):
+    """
+    elements of the top-level JSON array in fd, decoded one at a time.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    eof = False
+
+    def more(pos: int) -> int:
+        """
+        drop buf[:pos], read the next chunk. returns the new position of pos.
+        """
+        nonlocal buf, eof
+        chunk = fd.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        return 0
+
+    def next_char(pos: int) -> int:
+        """
+        position of the next non-whitespace character, len(buf) at the end of input.
+        """
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buf) or eof:
+                return pos
+            pos = more(pos)
+
+    pos = next_char(0)
+    if pos >= len(buf) or buf[pos] != '[':
+        raise ValueError('not a JSON array')
+    pos = next_char(pos + 1)
+    if pos < len(buf) and buf[pos] == ']':
+        return
+    while True:
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                pos = more(pos)  # the element continues in the next chunk
+                continue
+            if not eof and (end >= len(buf) or (isinstance(value, (int, float)) and buf[end] in '.eE+-')):
+                pos = more(pos)  # so may a number, cut after its digits or within '1.5e+3'
+                continue
+            break
+        yield value
+        pos = next_char(end)
+        if pos >= len(buf):
+            raise ValueError('unterminated JSON array')
+        if buf[pos] == ']':
+            return
+        if buf[pos] != ',':
+            raise ValueError(f'expect , or ] in JSON array, got {buf[pos]!r}')
+        pos = next_char(pos + 1)
+
+
+def entry_source(item: dict) -> str:
+    return os.path.normpath(os.path.join(item['directory'], item['file']))
+
+
+def digest_database(path: str, stats=NOSTATS) -> dict:
+    """
+    {source: sorted digests of its entries}, more than one when a file is compiled several times.
+    """
+    from .translator import CompilationDatabaseTranslator
+    translator = CompilationDatabaseTranslator()
+    digests = {}  # type:dict[str, list[bytes]]
+    n = 0
+    with open(path, encoding='utf-8') as fd:
+        for item in iter_json_array(fd):
+            digests.setdefault(entry_source(item), []).append(translator.canonical_digest(item))
+            n += 1
+    for v in digests.values():
+        if len(v) > 1:
+            v.sort()
+    stats.count('entries', n)
+    return digests
+
+
+def diff_databases(old_path: str, new_path: str, stats=NOSTATS) -> dict:
+    """
+    {'added': [sources], 'removed': [sources], 'changed': [sources], 'unchanged': int, ...}
+    source lists are sorted.
+    """
+    with stats.phase('old'):
+        old = digest_database(old_path, stats=stats)
+    with stats.phase('new'):
+        new = digest_database(new_path, stats=stats)
+    with stats.phase('compare'):
+        added = sorted(f for f in new if f not in old)
+        removed = sorted(f for f in old if f not in new)
+        changed = sorted(f for f, d in new.items() if f in old and old[f] != d)
+    return {
+        'old':       old_path,
+        'new':       new_path,
+        'files':     {'old': len(old), 'new': len(new)},
+        'added':     added,
+        'removed':   removed,
+        'changed':   changed,
+        'unchanged': len(new) - len(added) - len(changed),
+    }
@@ -0,0 +1,159 @@
+"""
+sorted, unique output of more strings than fit in memory.
+
+strings are deduplicated in memory until a budget is reached, then written as a sorted run
+to a temporary file. the runs are k-way merged with duplicates dropped, giving the same
+result as `sorted(set(strings))`.
+"""
+import os
+import sys
+import heapq
+import shutil
+import tempfile
+
+from .stats import NOSTATS
+
+
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+MERGE_FAN_IN = 64  # runs open at once, more are merged in passes
+_ENTRY_OVERHEAD = 48  # set slot and list pointer per string, roughly
+
+
+def parse_size(text: str) -> int:
+    """
+    '512M' -> bytes. K, M and G are powers of 1024, a bare number is bytes.
+    """
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    num = text.strip().upper()
+    if num.endswith('B'):
+        num = num[:-1]
+    scale = 1
+    if num and num[-1] in units:
+        scale = units[num[-1]]
+        num = num[:-1]
+    try:
+        size = int(float(num) * scale)
+    except ValueError:
+        raise ValueError(f'bad size, expect e.g. 512M: {text}')
+    if size <= 0:
+        raise ValueError(f'bad size, expect e.g. 512M: {text}')
+    return size
+
+
+def _unique(sorted_strings):
+    last = None
+    for s in sorted_strings:
+        if s != last:
+            yield s
+            last = s
+
+
+def _read_run(path: str):
+    with open(path, encoding='utf-8', errors='surrogatepass', newline='\n') as fd:
+        for line in fd:
+            yield line[:-1]
+
+
+class ExternalSorter(object):
+    """
+    collect strings with about `memory_limit` bytes of them in memory, then iter_sorted().
+    strings must not contain a newline, as in the line based outputs this feeds.
+
+    usage:
+        with ExternalSorter(memory_limit) as sorter:
+            sorter.update(paths)
+            for path in sorter.iter_sorted():
+                ...
+    """
+
+    def __init__(self, memory_limit: int = DEFAULT_MEMORY_LIMIT, tmpdir: str = None, stats=NOSTATS):
+        """
+        :param tmpdir: folder for the runs. [default: tempfile's, see TMPDIR]
+        """
+        self.memory_limit = memory_limit
+        self.tmpdir = tmpdir
+        self.stats = stats
+        self._buffer = set()  # type:set[str]
+        self._buffer_bytes = 0
+        self._runs = []  # type:list[str]
+        self._workdir = None
+        self._seq = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        remove the temporary runs.
+        """
+        self._buffer = set()
+        self._runs = []
+        if self._workdir is not None:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+
+    @property
+    def runs(self) -> int:
+        """
+        number of runs spilled so far.
+        """
+        return len(self._runs)
+
+    def add(self, s: str):
+        if s in self._buffer:
+            return
+        self._buffer.add(s)
+        self._buffer_bytes += sys.getsizeof(s) + _ENTRY_OVERHEAD
+        if self._buffer_bytes >= self.memory_limit:
+            self._spill()
+
+    def update(self, strings):
+        for s in strings:
+            self.add(s)
+
+    def _write_run(self, sorted_strings) -> str:
+        if self._workdir is None:
+            self._workdir = tempfile.mkdtemp(prefix='json2cmakelists-sort-', dir=self.tmpdir)
+        path = os.path.join(self._workdir, f'run_{self._seq:06d}.txt')
+        self._seq += 1
+        with open(path, mode='w', encoding='utf-8', errors='surrogatepass', newline='\n') as fd:
+            fd.writelines(s + '\n' for s in sorted_strings)
+        return path
+
+    def _spill(self):
+        with self.stats.phase('spill'):
+            self._runs.append(self._write_run(sorted(self._buffer)))
+        self.stats.count('spilled_runs')
+        self._buffer = set()
+        self._buffer_bytes = 0
+
+    def iter_sorted(self):
+        """
+        all strings added, sorted and unique. the sorter is emptied.
+        """
+        buffer = sorted(self._buffer)
+        self._buffer = set()
+        self._buffer_bytes = 0
+        runs, self._runs = self._runs, []
+        if not runs:
+            yield from buffer
+            return
+
+        # bounded open files: merge the oldest runs into one until the rest fit
+        with self.stats.phase('merge'):
+            while len(runs) + 1 > MERGE_FAN_IN:
+                group, runs = runs[:MERGE_FAN_IN], runs[MERGE_FAN_IN:]
+                runs.append(self._write_run(_unique(heapq.merge(*map(_read_run, group)))))
+                for path in group:
+                    os.unlink(path)
+        try:
+            yield from _unique(heapq.merge(buffer, *map(_read_run, runs)))
+        finally:
+            for path in runs:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
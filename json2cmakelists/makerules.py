@@ -0,0 +1,87 @@
+"""
+parse make's *.d files generated by compiler with `-MD` or `-MMD` option.
+
+See: https://gcc.gnu.org/onlinedocs/gcc/Preprocessor-Options.html
+"""
+import os
+from pathlib import Path
+import re
+
+from .stats import NOSTATS
+from .pathfilter import KEEP_ALL
+
+
+def filter_d_files(d_files: list[Path], stats=NOSTATS):
+    """
+    check: stem.d + stem.*
+    """
+    files: list[Path] = []
+    for fil in d_files:
+        parent = fil.parent
+        stem = fil.stem
+        if len(list(parent.glob(f'{stem}.*'))) >= 2:
+            files.append(fil)
+        else:
+            print(f'!!!orphan: {fil}')
+            stats.count('orphans')
+    return files
+
+
+def iter_d_files(sourcetree_root: str, stats=NOSTATS):
+    """
+    the non-orphan *.d files under sourcetree_root, sorted.
+    """
+    yield from filter_d_files(sorted(Path(sourcetree_root).rglob('*.d')), stats=stats)
+
+
+def parse_d_file(dfile: Path, stats=NOSTATS, path_filter=KEEP_ALL):
+    """
+    {target: [dependencies]}, relative dependencies resolved against the folder of dfile.
+    dependencies path_filter drops are skipped before they are normalized.
+    """
+    td = {}
+    try:
+        with open(dfile, encoding='utf-8') as fd:
+            text = fd.read()
+        parentdir = dfile.parent
+        matches: list[str] = re.findall(r'^\s*(.+?:.*?[^\\])\s*$', text, flags=re.MULTILINE | re.DOTALL)
+        for m in matches:
+            parts = m.split(':', maxsplit=1)
+            target = parts[0].strip()
+            dependencies = parts[1].strip()
+            deps = re.split(r'\s*\\\s*\n\s*|\s+', dependencies)
+            if path_filter:
+                kept = []
+                for x in deps:
+                    if os.path.isabs(x):
+                        if path_filter(x):
+                            kept.append(x)
+                    else:
+                        x = os.path.join(parentdir, x)
+                        if path_filter(x):
+                            kept.append(os.path.normpath(x))
+                deps = kept
+            else:
+                deps = list(map(lambda x: x if os.path.isabs(x) else os.path.normpath(os.path.join(parentdir, x)), deps))
+            td[target] = deps
+    except Exception as e:
+        print('!!!parse:', dfile, type(e), e)
+        stats.count('parse_errors')
+    stats.count('targets', len(td))
+    return td
+
+
+def iter_dependencies(dfiles, stats=NOSTATS, path_filter=KEEP_ALL):
+    """
+    dependencies of each rule file that path_filter keeps, duplicates included.
+    """
+    for dfile in dfiles:
+        with stats.phase('parse') as ph:
+            td = parse_d_file(dfile, stats=stats, path_filter=path_filter)
+        stats.latency('d_file', ph.wall)
+        for t, d in td.items():
+            yield from d
+
+
+def get_dependencies_from_dfiles(dfiles: list[Path], stats=NOSTATS):
+    return set(iter_dependencies(dfiles, stats=stats))
@@ -0,0 +1,362 @@
+"""
+get all built sources and macros from compile_commands.json, and included files from .ninja_deps.
+"""
+import sys
+import os
+import shlex
+import re
+import shutil
+from pathlib import Path
+
+from .stats import NOSTATS
+from .extsort import ExternalSorter, DEFAULT_MEMORY_LIMIT
+from .pathfilter import KEEP_ALL, PathFilter
+
+
+g_is_posix = not sys.platform.casefold().startswith('win')
+
+
+def _path_style(path: str):
+    """
+    determine path style.
+    """
+    if path.startswith('/'):
+        return 'posix'
+    if re.match(r'[A-Za-z]:', path):
+        return 'nt'
+    # if path.startswith(r'\\'):
+    #     return 'unc'
+    return None
+
+
+def _normpath(path: str) -> str:
+    if _path_style(path) == 'posix':
+        return Path(os.path.normpath(path)).as_posix()
+    return os.path.normpath(path)
+
+
+def iter_source_files(js: list):
+    """
+    absolute, normalized source file of each entry.
+    """
+    for dic in js:
+        fil = dic['file']
+        if not os.path.isabs(fil):
+            fil = os.path.join(dic['directory'], fil)
+        assert os.path.isabs(fil)
+        yield _normpath(fil)
+
+
+def iter_compile_commands(js: list):
+    """
+    tokenized compiler command of each entry.
+    """
+    if not js:
+        return
+    if 'arguments' in js[0]:
+        for dic in js:
+            yield dic['arguments']
+    elif 'command' in js[0]:
+        styles = [_path_style(dic['command']) for dic in js]
+        style_posix = any(map(lambda x: x == 'posix', styles))
+        style_nt = any(map(lambda x: x == 'nt', styles))
+        assert not (style_posix and style_nt), 'compilers in posix and nt path style?'
+        if style_posix:
+            is_posix = True
+        elif style_nt:
+            is_posix = False
+        else:
+            is_posix = g_is_posix
+        for dic in js:
+            yield shlex.split(dic['command'], posix=is_posix)
+
+
+def iter_macros(cmdparts: list):
+    """
+    -Dxxx, -D xxx, -Uxxx and -U xxx of one command, escapes decoded.
+    """
+    _D = '-D'
+    _U = '-U'
+    for i, pa in enumerate(cmdparts):
+        if not pa.startswith((_D, _U)):
+            continue
+        macro = (pa + ' ' + cmdparts[i + 1]) if pa in (_D, _U) else pa
+        yield bytes(macro, 'utf-8').decode('unicode_escape')
+
+
+def _parse_compile_commands_json(ccfile='compile_commands.json', stats=NOSTATS, path_filter=KEEP_ALL):
+    """
+    absolute paths, and macros. entries whose source path_filter drops are skipped.
+
+    see:
+      https://clang.llvm.org/docs/JSONCompilationDatabase.html
+    """
+    import json
+    with open(ccfile, encoding='utf-8') as fd:
+        with stats.phase('load'):
+            js = json.load(fd)
+        print(f'{ccfile} entries: {len(js)}')
+        stats.count('entries', len(js))
+        if path_filter:
+            total = len(js)
+            js = [dic for dic in js if path_filter(os.path.join(dic['directory'], dic['file']))]
+            stats.count('filtered_entries', total - len(js))
+
+        # source files
+        all_files = []  # type:list[str]
+        for fil in iter_source_files(js):
+            all_files.append(fil)
+            stats.distinct('paths', fil)
+
+        # macros
+        all_macros = {}  # type:dict[str, int]
+        with stats.phase('tokenize'):
+            compile_commands = list(iter_compile_commands(js))  # type:list[list[str]]
+
+        with stats.phase('classify'):
+            for cmdparts, dic in zip(compile_commands, js):
+                if stats.enabled:
+                    stats.distinct('flag_sets', tuple(pa for pa in cmdparts[1:] if pa != dic['file']))
+                for macro in iter_macros(cmdparts):
+                    if macro not in all_macros:
+                        all_macros[macro] = 1
+                    else:
+                        all_macros[macro] += 1
+
+        return all_files, all_macros
+
+
+def _which_ninja(ask=None):
+    """
+    :param ask: called with no argument to get a path when ninja is not in PATH, None to give up
+    """
+    ninja = 'ninja'
+    p = shutil.which(ninja)
+    if p is not None:
+        return ninja
+    while ask is not None:
+        p = ask()
+        if not p:
+            break
+        elif os.path.exists(p):
+            return p
+        else:
+            print(f'"{p}" not exist!')
+    return None
+
+
+def iter_ninja_deps(deps_info: list, pwd: str, path_filter=KEEP_ALL):
+    """
+    absolute, normalized paths in the output of `ninja -t deps`, duplicates included.
+    paths path_filter drops are skipped before they are normalized.
+    """
+    for line in deps_info:
+        if not line.startswith(' '):
+            continue
+        line = line.strip()
+        if (not line) or re.search(r'.+?:\s*#deps\s+?\d+?.+?deps\s+?mtime\s', line):
+            # TODO: skip the source file which is the next of #deps mark line
+            continue
+
+        if not os.path.isabs(line):
+            line = os.path.join(pwd, line)
+        assert os.path.isabs(line)
+        if path_filter and not path_filter(line):
+            continue
+        # same path maybe has posix or nt format
+        yield _normpath(line)
+
+
+def iter_ninja_deps_by_target(deps_info: list, pwd: str):
+    """
+    (target, [absolute, normalized deps]) for each `#deps` record of `ninja -t deps`.
+    the first dep is usually the source file.
+    """
+    target, deps = None, []
+    for line in deps_info:
+        if line.startswith(' '):
+            line = line.strip()
+            if line and target is not None:
+                if not os.path.isabs(line):
+                    line = os.path.join(pwd, line)
+                deps.append(_normpath(line))
+            continue
+        if target is not None:
+            yield target, deps
+        target, deps = None, []
+        m = re.match(r'(.+?):\s*#deps\s+\d+', line)
+        if m:
+            target = m.group(1)
+    if target is not None:
+        yield target, deps
+
+
+def _run_ninja_deps(cmake_ninja_build_root_abs: str = None, stats=NOSTATS, ninja: str = None):
+    """
+    lines of `ninja -t deps`, None on failure.
+    """
+    import subprocess
+    ninja = ninja or _which_ninja()
+    if not ninja:
+        print('ninja command not found, ignore include files')
+        return None
+    try:
+        with stats.phase('subprocess'):
+            cp = subprocess.run([ninja, '-t', 'deps'],
+                                capture_output=True, cwd=cmake_ninja_build_root_abs, check=True)
+        return cp.stdout.decode('utf-8').split('\n')
+    except Exception as e:
+        print(type(e), e)
+        return None
+
+
+def _iter_ninja_deps_lines(cmake_ninja_build_root_abs: str = None, stats=NOSTATS, ninja: str = None):
+    """
+    lines of `ninja -t deps` as ninja prints them, without holding the whole output.
+    """
+    import subprocess
+    ninja = ninja or _which_ninja()
+    if not ninja:
+        print('ninja command not found, ignore include files')
+        return
+    try:
+        proc = subprocess.Popen([ninja, '-t', 'deps'], stdout=subprocess.PIPE,
+                                cwd=cmake_ninja_build_root_abs, encoding='utf-8')
+    except OSError as e:
+        print(type(e), e)
+        return
+    n = 0
+    with proc:
+        for line in proc.stdout:
+            n += 1
+            yield line.rstrip('\n')
+    if proc.returncode:
+        print(f'`{ninja} -t deps` failed with exit code {proc.returncode}, include files may be incomplete')
+    stats.count('dep_lines', n)
+
+
+def _get_include_files_using_ninja(cmake_ninja_build_root_abs: str = None, stats=NOSTATS, ninja: str = None):
+    """
+    absolute paths.
+
+    see:
+      https://ninja-build.org/manual.html#ref_headers
+      https://github.com/ninja-build/ninja/blob/v1.11.1/src/ninja.cc#L559
+    """
+    assert (cmake_ninja_build_root_abs is None) or os.path.isabs(cmake_ninja_build_root_abs)
+    pwd = cmake_ninja_build_root_abs
+    empty_ret = []
+
+    deps_info = _run_ninja_deps(pwd, stats=stats, ninja=ninja)
+    if deps_info is None:
+        return empty_ret
+
+    if pwd is None:
+        pwd = os.getcwd()
+    with stats.phase('parse'):
+        include_files = set(iter_ninja_deps(deps_info, pwd))
+    stats.count('dep_lines', len(deps_info))
+    return include_files
+
+
+def get_source_files_and_macros(cmakebuild_root: str = None, stats=NOSTATS, path_filter=KEEP_ALL):
+    print('get sources files...')
+    ccfile = os.path.join('.' if cmakebuild_root is None else cmakebuild_root, 'compile_commands.json')
+    return _parse_compile_commands_json(ccfile, stats=stats, path_filter=path_filter)
+
+
+def get_include_files(cmakebuild_root: str = None, stats=NOSTATS, ninja: str = None):
+    print('get include files...')
+    if Path('.' if cmakebuild_root is None else cmakebuild_root).joinpath('.ninja_deps').exists():
+        return _get_include_files_using_ninja(cmakebuild_root, stats=stats, ninja=ninja)
+    else:
+        # TODO: compile, use command adding '-MM' or '/showIncludes' option
+        return []
+
+
+def iter_include_files(cmakebuild_root: str = None, stats=NOSTATS, ninja: str = None, path_filter=KEEP_ALL):
+    """
+    get_include_files() streamed from ninja: duplicates included, nothing held in memory.
+    """
+    print('get include files...')
+    if not Path('.' if cmakebuild_root is None else cmakebuild_root).joinpath('.ninja_deps').exists():
+        return
+    assert (cmakebuild_root is None) or os.path.isabs(cmakebuild_root)
+    pwd = os.getcwd() if cmakebuild_root is None else cmakebuild_root
+    yield from iter_ninja_deps(_iter_ninja_deps_lines(cmakebuild_root, stats=stats, ninja=ninja), pwd,
+                               path_filter=path_filter)
+
+
+def _include_filter(sourcetree_root: str, all_files: bool, path_filter):
+    if path_filter is not None:
+        return path_filter
+    return KEEP_ALL if all_files else PathFilter(roots=[sourcetree_root])
+
+
+def write_filelist(output_filelist_txt: str, source_files: list, include_files, sourcetree_root: str,
+                   all_files: bool = False, memory_limit: int = DEFAULT_MEMORY_LIMIT, path_filter=None,
+                   stats=NOSTATS) -> int:
+    """
+    sources in database order, an empty line, then the sorted includes which are not sources.
+
+    :param include_files: any iterable, duplicates allowed
+    :param all_files: keep the includes outside sourcetree_root too
+    :param memory_limit: bytes of includes held in memory before sorted runs spill to temporary files
+    :param path_filter: PathFilter for the includes instead of sourcetree_root and all_files
+    :return: number of paths written
+    """
+    keep = _include_filter(sourcetree_root, all_files, path_filter)
+    exists = set()
+    with open(output_filelist_txt, mode='w', encoding='utf-8') as fd:
+        # files
+        for fil in source_files:
+            exists.add(fil)
+            # fil = os.path.relpath(fil, sourcetree_root)
+            print(fil, file=fd)
+
+        print('', file=fd)
+
+        # sorted deps
+        written = len(exists)
+        with ExternalSorter(memory_limit, stats=stats) as tmp:
+            for fil in include_files:
+                if fil in exists:
+                    continue
+                if keep and not keep(fil):
+                    continue
+                # fil = os.path.relpath(fil, sourcetree_root)
+                tmp.add(fil)
+            for fil in tmp.iter_sorted():
+                print(fil, file=fd)
+                written += 1
+    return written
+
+
+def write_filelist_binary(output_pathlist: str, source_files: list, include_files, sourcetree_root: str,
+                          all_files: bool = False, memory_limit: int = DEFAULT_MEMORY_LIMIT, path_filter=None,
+                          stats=NOSTATS) -> int:
+    """
+    the paths of write_filelist() as one sorted binary path list, see pathlist.py.
+
+    :return: number of paths written
+    """
+    from .pathlist import write_pathlist
+    keep = _include_filter(sourcetree_root, all_files, path_filter)
+    with ExternalSorter(memory_limit, stats=stats) as tmp:
+        tmp.update(source_files)
+        for fil in include_files:
+            if not keep or keep(fil):
+                tmp.add(fil)
+        return write_pathlist(output_pathlist, tmp.iter_sorted())
+
+
+def write_macros(output_macros_txt: str, macros: list):
+    """
+    :param macros: [(macro, count)]
+    """
+    with open(output_macros_txt, mode='w', encoding='utf-8') as fd:
+        delim = '\t\t'
+        print(f'<MACRO>{delim}<COUNT>', file=fd)
+        for macro_cnt in macros:
+            line = delim.join(map(str, macro_cnt))
+            print(line, file=fd)
@@ -0,0 +1,85 @@
+"""
+keep or drop paths by source roots, excluded subtrees and glob patterns.
+
+roots and excluded subtrees are stored in a trie of path components. a path is classified
+in one walk of its components: the deepest root or exclude it lies under decides, so a root
+inside an excluded subtree is kept again. glob patterns are compiled into one regex and drop
+paths the trie keeps.
+"""
+import os
+import re
+import fnmatch
+
+
+_MARK = None  # trie key of a node's verdict, never a path component
+
+
+def _components(path: str) -> list:
+    if '\\' in path:
+        path = path.replace('\\', '/')
+    return [c for c in path.split('/') if c and c != '.']
+
+
+class PathFilter(object):
+    """
+    usage:
+        keep = PathFilter(roots=['/src'], excludes=['/src/third_party'], exclude_globs=['*.pb.h'])
+        paths = [p for p in paths if keep(p)]
+
+    with no roots every path not excluded is kept. paths should be absolute; ones with '..'
+    components are normalized before the walk, others are classified as given.
+    """
+
+    def __init__(self, roots=(), excludes=(), exclude_globs=()):
+        self.roots = [os.path.abspath(r) for r in roots]
+        self.excludes = [os.path.abspath(e) for e in excludes]
+        self.exclude_globs = list(exclude_globs)
+        self._default = not self.roots
+        self._trie = {}
+        for root in self.roots:
+            self._insert(root, True)
+        for exclude in self.excludes:
+            self._insert(exclude, False)  # wins over an identical root
+        self._globs = re.compile('|'.join(fnmatch.translate(g) for g in self.exclude_globs)) \
+            if self.exclude_globs else None
+
+    def _insert(self, path: str, verdict: bool):
+        node = self._trie
+        for c in _components(path):
+            node = node.setdefault(c, {})
+        node[_MARK] = verdict
+
+    def __bool__(self) -> bool:
+        """
+        False when every path is kept, so callers can skip the check.
+        """
+        return bool(self.roots or self.excludes or self.exclude_globs)
+
+    def __call__(self, path: str) -> bool:
+        """
+        True to keep path.
+        """
+        comps = _components(path)
+        if '..' in comps:
+            comps = _components(os.path.normpath(path))
+        node = self._trie
+        verdict = node.get(_MARK, self._default)  # set by a root or exclude of '/'
+        for c in comps:
+            node = node.get(c)
+            if node is None:
+                break
+            v = node.get(_MARK)
+            if v is not None:
+                verdict = v
+        if verdict and self._globs is not None and self._globs.match(path):
+            return False
+        return verdict
+
+    def without_roots(self) -> 'PathFilter':
+        """
+        the same excludes, keeping everything else.
+        """
+        return PathFilter(excludes=self.excludes, exclude_globs=self.exclude_globs)
+
+
+KEEP_ALL = PathFilter()
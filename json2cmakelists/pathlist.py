@@ -0,0 +1,199 @@
+"""
+compact binary file lists: sorted, unique paths, front-coded in blocks, with a block index.
+
+layout, integers little endian:
+    header  magic b'J2CPATHS', u32 version, u32 paths per block, u64 paths, u64 index offset
+    blocks  per path: varint shared prefix length, varint suffix length, utf-8 suffix.
+            the first path of a block shares nothing with the previous one
+    index   u64 file offset of each block
+
+PathList reads it through mmap: iterate, test `path in pathlist`, or list the paths under
+a prefix, decoding only the blocks needed.
+"""
+import os
+import mmap
+import struct
+
+
+MAGIC = b'J2CPATHS'
+VERSION = 1
+DEFAULT_BLOCK_SIZE = 64
+SUFFIX = '.pathlist'
+_HEADER = struct.Struct('<8sIIQQ')
+_OFFSET = struct.Struct('<Q')
+
+
+def pathlist_name(text_output: str) -> str:
+    """
+    name of the binary output written instead of a text one: 'x-filelist.txt' -> 'x-filelist.pathlist'
+    """
+    return os.path.splitext(text_output)[0] + SUFFIX
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _read_varint(buf, pos: int) -> tuple:
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7f) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _encode(path: str) -> bytes:
+    return path.encode('utf-8', errors='surrogatepass')
+
+
+def _decode(key: bytes) -> str:
+    return key.decode('utf-8', errors='surrogatepass')
+
+
+def write_pathlist(output: str, sorted_paths, block_size: int = DEFAULT_BLOCK_SIZE) -> int:
+    """
+    :param sorted_paths: strictly increasing paths, e.g. ExternalSorter.iter_sorted()
+    :param block_size: paths per block; larger blocks compress better, smaller ones search faster
+    :return: number of paths written
+    """
+    offsets = []  # type:list[int]
+    count = 0
+    prev = b''
+    with open(output, mode='wb') as fd:
+        fd.write(_HEADER.pack(MAGIC, VERSION, block_size, 0, 0))
+        for path in sorted_paths:
+            key = _encode(path)
+            if count and key <= prev:
+                raise ValueError(f'paths not sorted and unique: {path!r} after {_decode(prev)!r}')
+            if count % block_size == 0:
+                offsets.append(fd.tell())
+                shared = 0
+            else:
+                shared = len(os.path.commonprefix((prev, key)))
+            fd.write(_varint(shared) + _varint(len(key) - shared) + key[shared:])
+            prev = key
+            count += 1
+        index_offset = fd.tell()
+        fd.write(b''.join(_OFFSET.pack(o) for o in offsets))
+        fd.seek(0)
+        fd.write(_HEADER.pack(MAGIC, VERSION, block_size, count, index_offset))
+    return count
+
+
+class PathList(object):
+    """
+    read-only view of a file written by write_pathlist().
+
+    usage:
+        with PathList('x-filelist.pathlist') as paths:
+            if '/src/a.h' in paths:
+                ...
+            for path in paths.iter_prefix('/src/include/'):
+                ...
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = open(path, mode='rb')
+        try:
+            if os.fstat(self._fd.fileno()).st_size < _HEADER.size:
+                raise ValueError(f'{path}: not a path list')
+            self._mm = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.block_size, self._count, self._index = _HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f'{path}: not a path list')
+            if version != VERSION:
+                raise ValueError(f'{path}: unsupported path list version {version}')
+        except Exception:
+            self.close()
+            raise
+        self._blocks = (self._count + self.block_size - 1) // self.block_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        mm = getattr(self, '_mm', None)
+        if mm is not None:
+            mm.close()
+            self._mm = None
+        self._fd.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _block_offset(self, i: int) -> int:
+        return _OFFSET.unpack_from(self._mm, self._index + i * _OFFSET.size)[0]
+
+    def _iter_keys(self, block: int):
+        """
+        utf-8 paths from the start of `block` to the end.
+        """
+        mm = self._mm
+        for b in range(block, self._blocks):
+            pos = self._block_offset(b)
+            key = b''
+            for _ in range(min(self.block_size, self._count - b * self.block_size)):
+                shared, pos = _read_varint(mm, pos)
+                length, pos = _read_varint(mm, pos)
+                key = key[:shared] + mm[pos:pos + length]
+                pos += length
+                yield key
+
+    def _first_key(self, block: int) -> bytes:
+        pos = self._block_offset(block)
+        _shared, pos = _read_varint(self._mm, pos)
+        length, pos = _read_varint(self._mm, pos)
+        return self._mm[pos:pos + length]
+
+    def _find_block(self, key: bytes) -> int:
+        """
+        the last block whose first path is <= key, 0 if none.
+        """
+        lo, hi = 0, self._blocks
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._first_key(mid) <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return max(lo - 1, 0)
+
+    def __iter__(self):
+        for key in self._iter_keys(0):
+            yield _decode(key)
+
+    def __contains__(self, path: str) -> bool:
+        if not self._count:
+            return False
+        key = _encode(path)
+        block = self._find_block(key)
+        for i, k in enumerate(self._iter_keys(block)):
+            if k >= key or i + 1 >= self.block_size:
+                return k == key
+        return False
+
+    def iter_prefix(self, prefix: str):
+        """
+        paths starting with `prefix`, in order.
+        """
+        if not self._count:
+            return
+        key = _encode(prefix)
+        for k in self._iter_keys(self._find_block(key)):
+            if k < key:
+                continue
+            if not k.startswith(key):
+                break
+            yield _decode(k)
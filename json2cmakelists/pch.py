@@ -0,0 +1,208 @@
+"""
+precompiled header and unity build recommendations from per-TU dependency data.
+
+headers are ranked by inclusion count times size (a proxy of parse cost). entries
+compiled with the same flags become one target, which gets the headers most of its
+TUs include as precompiled headers, and UNITY_BUILD batches.
+"""
+import os
+
+from .stats import NOSTATS
+
+
+def _source_key(path: str) -> str:
+    return os.path.normcase(os.path.normpath(path))
+
+
+def tu_headers_from_d_files(dfiles, stats=NOSTATS) -> dict:
+    """
+    {source: [headers]} from *.d rule files, the first dependency being the source.
+    relative paths are resolved against the rule file's folder, as parse_d_file() does,
+    see plan_build() for sources which are not found that way.
+    """
+    from .makerules import parse_d_file
+    tu_headers = {}
+    for dfile in dfiles:
+        with stats.phase('parse'):
+            td = parse_d_file(dfile, stats=stats)
+        for deps in td.values():
+            if deps:
+                tu_headers[_source_key(deps[0])] = deps[1:]
+    return tu_headers
+
+
+def tu_headers_from_ninja(deps_info: list, pwd: str) -> dict:
+    """
+    {source: [headers]} from the output of `ninja -t deps`.
+    """
+    from .ninjadeps import iter_ninja_deps_by_target
+    tu_headers = {}
+    for _target, deps in iter_ninja_deps_by_target(deps_info, pwd):
+        if deps:
+            tu_headers[_source_key(deps[0])] = deps[1:]
+    return tu_headers
+
+
+def tu_headers_from_results(result_files: list) -> dict:
+    """
+    {source: [headers]} from `compiler-deps --shard` result files.
+    """
+    import json
+    tu_headers = {}
+    for path in result_files:
+        with open(path, encoding='utf-8') as fd:
+            for line in fd:
+                res = json.loads(line)
+                if 'shard' in res:
+                    continue  # header line
+                tu_headers[_source_key(res['file'])] = res['includes']
+    return tu_headers
+
+
+class FileSizes(object):
+    """
+    cached file sizes, 0 for files which do not exist (any more).
+    """
+
+    def __init__(self):
+        self._sizes = {}  # type:dict[str, int]
+
+    def __call__(self, path: str) -> int:
+        size = self._sizes.get(path)
+        if size is None:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            self._sizes[path] = size
+        return size
+
+
+def rank_headers(tu_headers: dict, sizes=None) -> list:
+    """
+    [(header, count, size, count * size)], most expensive first.
+    """
+    sizes = sizes or FileSizes()
+    counts = {}  # type:dict[str, int]
+    for headers in tu_headers.values():
+        for h in set(headers):
+            counts[h] = counts.get(h, 0) + 1
+    ranked = [(h, c, sizes(h), c * sizes(h)) for h, c in counts.items()]
+    ranked.sort(key=lambda x: (-x[3], x[0]))
+    return ranked
+
+
+def _unity_bytes(sources: list, headers: list, pch: set, batch: int, sizes) -> int:
+    """
+    bytes preprocessed when `batch` consecutive TUs share one compilation: each header once per batch.
+    """
+    total = 0
+    for i in range(0, len(sources), batch):
+        seen = set()
+        for src, hs in zip(sources[i:i + batch], headers[i:i + batch]):
+            total += sizes(src)
+            seen.update(h for h in hs if h not in pch)
+        total += sum(sizes(h) for h in seen)
+    return total
+
+
+def plan_build(groups: dict, tu_headers: dict, pch_max: int = 10, pch_min_share: float = 1.0,
+               unity_batch: int = 8, sizes=None) -> tuple:
+    """
+    :param groups: {flags: [entries]} from CompilationDatabaseTranslator.group_by_flags()
+    :param tu_headers: {source: [headers]}, see tu_headers_from_*()
+    :param pch_max: precompiled headers per target, 0 for none
+    :param pch_min_share: a header is precompiled if at least this share of the target's TUs include it
+    :param unity_batch: UNITY_BUILD_BATCH_SIZE, 0 or 1 for no unity build
+    :return: (plan, report). plan is a list of
+             {'flags': flags, 'items': [entries], 'pch': [headers], 'unity_batch_size': int}
+             for CompilationDatabaseTranslator.convert_db_to_cmakelists(fd, groups=plan)
+    """
+    sizes = sizes or FileSizes()
+    by_name = {}  # type:dict[str, list[str]]
+    for key in tu_headers:
+        by_name.setdefault(os.path.basename(key), []).append(key)
+
+    def lookup(src: str, rel: str):
+        hs = tu_headers.get(_source_key(src))
+        if hs is None:
+            # rule files written relative to a folder other than their own: match the entry's file as a suffix
+            tail = os.sep + _source_key(rel)
+            for key in by_name.get(os.path.basename(tail), ()):
+                if key.endswith(tail):
+                    return tu_headers[key]
+        return hs
+
+    plan = []
+    report_groups = []
+    total = {'tus': 0, 'matched_tus': 0, 'bytes_before': 0, 'bytes_after_pch': 0, 'bytes_after': 0}
+
+    for flags, items in groups.items():
+        sources = [os.path.normpath(os.path.join(item['directory'], item['file'])) for item in items]
+        headers = []
+        matched = 0
+        for src, item in zip(sources, items):
+            hs = lookup(src, item['file'])
+            if hs is not None:
+                matched += 1
+            headers.append(hs or [])
+
+        # precompiled headers: widely included within this target, by count * size
+        pch = []
+        if pch_max > 0 and len(items) >= 2 and matched:
+            counts = {}  # in the order the TUs include them
+            for hs in headers:
+                for h in dict.fromkeys(hs):
+                    counts[h] = counts.get(h, 0) + 1
+            # a TU without dependency data may not include the header: it counts against the share
+            candidates = [(c * sizes(h), h) for h, c in counts.items()
+                          if c >= 2 and c >= pch_min_share * len(items) and sizes(h) > 0]
+            candidates.sort(key=lambda x: (-x[0], x[1]))
+            # force-included in the listed order: keep the include order, a header may need an earlier one
+            order = {h: i for i, h in enumerate(counts)}
+            pch = sorted((h for _, h in candidates[:pch_max]), key=order.get)
+        pch_set = set(pch)
+        batch = unity_batch if (unity_batch and unity_batch > 1 and len(items) >= 2) else 0
+
+        before = sum(sizes(s) + sum(sizes(h) for h in hs) for s, hs in zip(sources, headers))
+        pch_once = sum(sizes(h) for h in pch)  # building the precompiled header itself
+        after_pch = pch_once + sum(sizes(s) + sum(sizes(h) for h in hs if h not in pch_set)
+                                   for s, hs in zip(sources, headers))
+        after = pch_once + _unity_bytes(sources, headers, pch_set, batch, sizes) if batch else after_pch
+
+        plan.append({'flags': flags, 'items': items, 'pch': pch, 'unity_batch_size': batch})
+        report_groups.append({
+            'target':           f'target_group_{len(plan)}',
+            'tus':              len(items),
+            'matched_tus':      matched,
+            'pch':              pch,
+            'unity_batch_size': batch,
+            'bytes_before':     before,
+            'bytes_after':      after,
+        })
+        total['tus'] += len(items)
+        total['matched_tus'] += matched
+        total['bytes_before'] += before
+        total['bytes_after_pch'] += after_pch
+        total['bytes_after'] += after
+
+    report = dict(total)
+    report['targets'] = len(plan)
+    report['top_headers'] = [{'header': h, 'count': c, 'size': s, 'score': sc}
+                             for h, c, s, sc in rank_headers(tu_headers, sizes)[:20]]
+    report['groups'] = report_groups
+    return plan, report
+
+
+def print_report(report: dict):
+    before = report['bytes_before']
+
+    def pct(n):
+        return f'{100.0 * n / before:.1f}%' if before else '-'
+    print(f"TUs: {report['tus']} (with dependency data: {report['matched_tus']}), targets: {report['targets']}")
+    print(f"bytes preprocessed before:      {before}")
+    print(f"bytes preprocessed after pch:   {report['bytes_after_pch']} ({pct(report['bytes_after_pch'])})")
+    print(f"bytes preprocessed after unity: {report['bytes_after']} ({pct(report['bytes_after'])})")
+    print('top headers (count x size):')
+    for h in report['top_headers'][:10]:
+        print(f"  {h['score']:>12}  {h['count']:>6} x {h['size']:<8} {h['header']}")
@@ -0,0 +1,162 @@
+"""
+per-phase timing, counters and latency histograms shared by the scripts.
+
+the report is written as JSON by `--stats FILE` (alias `--profile FILE`).
+"""
+import sys
+import os
+import time
+import contextlib
+
+try:
+    import resource  # posix only
+except ImportError:
+    resource = None
+
+
+def _peak_rss_kb(who=None):
+    """
+    peak resident set size in KiB, None if unknown on this platform.
+    """
+    if resource is None:
+        return None
+    if who is None:
+        who = resource.RUSAGE_SELF
+    rss = resource.getrusage(who).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024  # bytes on macOS, KiB elsewhere
+    return rss
+
+
+def _percentile(sorted_values: list, pct: float):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def _histogram(values: list) -> dict:
+    """
+    summary plus power-of-two millisecond buckets: {'<=1ms': n, '<=2ms': n, ...}
+    """
+    vals = sorted(values)
+    buckets = {}
+    for v in vals:
+        ms = v * 1000.0
+        edge = 1
+        while edge < ms:
+            edge *= 2
+        key = f'<={edge}ms'
+        buckets[key] = buckets.get(key, 0) + 1
+    return {
+        'count':   len(vals),
+        'total_s': sum(vals),
+        'min_s':   vals[0] if vals else None,
+        'max_s':   vals[-1] if vals else None,
+        'mean_s':  (sum(vals) / len(vals)) if vals else None,
+        'p50_s':   _percentile(vals, 50),
+        'p90_s':   _percentile(vals, 90),
+        'p99_s':   _percentile(vals, 99),
+        'buckets': buckets,
+    }
+
+
+class _Timing(object):
+    __slots__ = ('wall', 'cpu')
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+
+
+class RunStats(object):
+    """
+    collector for one run of a tool. when disabled every method is a cheap no-op,
+    so callers can record unconditionally.
+    """
+
+    def __init__(self, tool: str, enabled: bool = True):
+        self.tool = tool
+        self.enabled = enabled
+        self.phases = {}  # type:dict[str, dict]
+        self.counters = {}  # type:dict[str, int]
+        self.distincts = {}  # type:dict[str, set]
+        self.latencies = {}  # type:dict[str, list[float]]
+        self._wall0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """
+        accumulate wall and CPU time spent in the `with` block under `name`.
+        the yielded object holds the timing of this block once it exits.
+        """
+        timing = _Timing()
+        if not self.enabled:
+            yield timing
+            return
+        w0 = time.perf_counter()
+        c0 = time.process_time()
+        try:
+            yield timing
+        finally:
+            timing.wall = time.perf_counter() - w0
+            timing.cpu = time.process_time() - c0
+            self.add_phase(name, timing.wall, timing.cpu)
+
+    def add_phase(self, name: str, wall: float, cpu: float = 0.0):
+        if not self.enabled:
+            return
+        ph = self.phases.get(name)
+        if ph is None:
+            ph = self.phases[name] = {'wall_s': 0.0, 'cpu_s': 0.0, 'calls': 0}
+        ph['wall_s'] += wall
+        ph['cpu_s'] += cpu
+        ph['calls'] += 1
+
+    def count(self, name: str, n: int = 1):
+        if not self.enabled:
+            return
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def distinct(self, name: str, value):
+        """
+        count distinct hashable values, e.g. paths or flag sets.
+        """
+        if not self.enabled:
+            return
+        self.distincts.setdefault(name, set()).add(value)
+
+    def latency(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+        self.latencies.setdefault(name, []).append(seconds)
+
+    def report(self) -> dict:
+        counters = dict(self.counters)
+        for name, values in self.distincts.items():
+            counters[f'distinct_{name}'] = len(values)
+        return {
+            'tool':            self.tool,
+            'argv':            sys.argv,
+            'pid':             os.getpid(),
+            'wall_s':          time.perf_counter() - self._wall0,
+            'cpu_s':           time.process_time() - self._cpu0,
+            'peak_rss_kb':     _peak_rss_kb(),
+            'children_rss_kb': _peak_rss_kb(resource.RUSAGE_CHILDREN) if resource else None,
+            'phases':          self.phases,
+            'counters':        counters,
+            'latency':         {k: _histogram(v) for k, v in self.latencies.items()},
+        }
+
+    def dump(self, path: str):
+        if not self.enabled or not path:
+            return
+        import json
+        with open(path, mode='w', encoding='utf-8') as fd:
+            json.dump(self.report(), fd, indent=2, sort_keys=True)
+            fd.write('\n')
+        print(f'stats: {path}')
+
+
+NOSTATS = RunStats(None, enabled=False)
@@ -0,0 +1,533 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import os.path
+import json
+import re
+import shlex
+import subprocess
+import hashlib
+
+from .stats import NOSTATS
+
+
+# a command without quotes, escapes or unusual whitespace splits the same with str.split()
+_SHLEX_SPECIAL = re.compile(r'[\'"\\\x0b\x0c\x1c-\x1f]')
+
+
+# # Get the path in _style_ form
+# # @path:
+# # @style: normal / relative / absolute
+# # @relativeTo:
+# def getPathOf(path, style=None, relativeTo=None):
+#     p = None
+#     if style in ('normal'):
+#         p = os.path.normpath(os.path.expanduser(path))
+#     elif style in ('relative'):
+#         pass
+#     elif style in ('absolute'):
+#         pass
+#     else:
+#         print('WARN: unrecognized parameter! @', sys._getframe().f_code.co_name, ':', sys._getframe().f_lineno, sep='')
+#
+#     if p is None:
+#         print('WARN: use original path! @', sys._getframe().f_code.co_name, ':', sys._getframe().f_lineno, sep='')
+#         return path
+#     else:
+#         return p
+
+
+class CompilationDatabaseTranslator(object):
+    def __init__(self, stats=NOSTATS):
+        # json data
+        self.db = []
+        self.stats = stats
+        # https://gcc.gnu.org/onlinedocs/gcc/Directory-Options.html
+        # directories to be searched for include header:
+        # 1. .                   : #include "file".
+        # 2. -iquote, -Ixxx -I-  : #include "file".  [NO]
+        # 3. -I                  : both #include "file" and #include <file>.
+        # 4. -isystem            : both #include "file" and #include <file>.
+        # 5. standard system dir : both #include "file" and #include <file>.
+        # 6. -idirafter          : both #include "file" and #include <file>.  [NO]
+        # NOTICE: [NO], i.e. -iquote and -idirafter, have no equivalent cmake-command.
+        # so I put these two in options as a workaround.
+        self.target_options = []
+        self.target_defines = []
+        # self.target_include_iquote = []
+        self.target_include_I = []
+        self.target_include_isystem = []
+        # self.target_include_idirafter = []
+        # position in db -> variant number, for files compiled with different arguments
+        self.variant_of = {}
+
+    def load(self, fd):
+        with self.stats.phase('load'):
+            self.db = json.load(fd)
+        self.stats.count('entries', len(self.db))
+
+    def store(self, fd, toDirectory=None):
+        fd.write(json.dumps(self.db, sort_keys=True, indent=4))
+
+    # Format the command entry to _style_.
+    # @style: command/arguments
+    def format_command_entry_to(self, style=None):
+        if style in ('command'):
+            old = 'arguments'
+            new = 'command'
+            for item in self.db:
+                if old in item:
+                    value = ' '.join(item[old])
+                    del item[old]
+                    item[new] = value
+        elif style in ('arguments'):
+            old = 'command'
+            new = 'arguments'
+            for item in self.db:
+                if old in item:
+                    value = shlex.split(item[old])
+                    del item[old]
+                    item[new] = value
+        else:
+            print('WARN: unrecognized parameter! @', sys._getframe().f_code.co_name, ':', sys._getframe().f_lineno,
+                  sep='')
+
+    # # Format the paths in _entry_'s value to _style._
+    # # In practice, the directory's value is always absolute, so others can be relative to it.
+    # # @entry: command/arguments/directory/file/all
+    # # @style: absolute/relative
+    # def format_paths_style(self, entry='all', style=None):
+    #     if style in ('absolute'):
+    #         for item in self.db:
+    #             if entry in ('command', 'arguments'):
+    #                 # TODO
+    #                 pass
+    #             elif entry in ('file'):
+    #                 # path = os.path.normpath(os.path.expanduser(item['directory'] + '/' + item['file']))
+    #                 path = os.path.normpath(os.path.expanduser(item['file']))
+    #                 if path not exist:
+    #                     path = os.path.normpath(os.path.expanduser(os.path.join(item['directory'], item['file'])))
+    #                 del item['file']
+    #                 item['file'] = path
+    #             elif entry in ('directory'):
+    #                 pass
+    #             else:
+    #                 pass
+    #     elif style in ('relative'):  # relative to directory
+    #         for item in self.db:
+    #             pass
+    #     else:
+    #         pass
+
+
+    # Write CMakeLists.txt, one target per entry; or one target per group when
+    # _groups_ (a build plan from pch.plan_build()) is given.
+    def convert_db_to_cmakelists(self, fd, groups=None):
+        cwd = os.getcwd()
+        for item in self.db:
+            if item['directory'] != cwd:
+                print('WARN: directory=%s, file=%s is NOT relative to CWD!' % (item['directory'], item['file']))
+        cwd = None
+
+        if groups is not None:
+            self.convert_groups_to_cmakelists(fd, groups)
+            return
+
+        self.write_cmake_header(fd)
+
+        stats = self.stats
+        seq_num = 0
+        # seq_num - 1 is the position in db, see remove_duplicates()
+        for item in self.db:
+            seq_num += 1
+            stats.distinct('paths', item['file'])
+            with stats.phase('tokenize'):
+                cmdvalue = self.tokenize_entry(item)
+            with stats.phase('classify'):
+                self.classify_entry(item, cmdvalue)
+            stats.distinct('flag_sets', (tuple(self.target_options), tuple(self.target_defines),
+                                         tuple(self.target_include_I), tuple(self.target_include_isystem)))
+            # Then, write one item to file
+            with stats.phase('write'):
+                self.write_cmake_target(fd, seq_num, item)
+                fd.write('\n')
+
+    def write_cmake_header(self, fd, min_version='2.8.12'):
+        cmakelists_header = """\
+cmake_minimum_required(VERSION %s)
+project(autogenerated)
+#SET(CMAKE_EXPORT_COMPILE_COMMANDS ON)
+""" % min_version
+        fd.write(cmakelists_header)
+        fd.write('\n')
+
+    # Split the compiler command of one entry into a new list of arguments.
+    def tokenize_entry(self, item):
+        cmdvalue = None
+        if 'command' in item:
+            command = item['command']
+            if command.isascii() and not _SHLEX_SPECIAL.search(command):
+                cmdvalue = command.split()
+            else:
+                cmdvalue = shlex.split(command)
+        elif 'arguments' in item:
+            if isinstance(item['arguments'], list):
+                cmdvalue = list(item['arguments'])  # copy, classify_entry() modifies it
+                # for i in range(len(cmdvalue)):
+                #     cmdvalue[i] = cmdvalue[i].strip()  # remove leading and trailing whitespaces
+            else:
+                print('Error: value of entry arguments is not list type!')
+        else:
+            print('Error: no commands entry found! @', sys._getframe().f_code.co_name, ':',
+                  sys._getframe().f_lineno, sep='')
+        return cmdvalue
+
+    # Sort the arguments of one entry into target_options/defines/include_I/include_isystem.
+    def classify_entry(self, item, cmdvalue):
+        self.target_options = []
+        self.target_defines = []
+        self.target_include_I = []
+        self.target_include_isystem = []
+        del cmdvalue[0]  # remove the beginning cc/c++
+        iquote_flag = False
+        for i in reversed(range(len(cmdvalue))):
+            if cmdvalue[i] == item['file'].strip():
+                # del cmdvalue[i]
+                cmdvalue[i] = ''  # leave an empty hole there
+            elif cmdvalue[i] == '-o':
+                cmdvalue[i + 1] = ''
+                cmdvalue[i] = ''
+            elif cmdvalue[i] == '-c':
+                cmdvalue[i] = ''
+            elif cmdvalue[i] == '-I-':
+                iquote_flag = True
+                cmdvalue[i] = ''
+            elif cmdvalue[i] == '-I' and cmdvalue[i + 1] == '-':
+                iquote_flag = True
+                cmdvalue[i + 1] = ''
+                cmdvalue[i] = ''
+            elif cmdvalue[i].startswith('-I') and iquote_flag:
+                cmdvalue[i].replace('-I', '-iquote', 1)  # treat those -Ixxx before -I- as -iquote
+
+        i = -1
+        cmdvalue_len = len(cmdvalue)
+        while True:
+            i += 1
+            if i >= cmdvalue_len:
+                break  # yeah, i as index, c++ for() style. ugly but work, ha~ :-)
+
+            # include
+            if cmdvalue[i] == '-iquote':
+                self.target_options.append(cmdvalue[i])
+                i += 1
+                self.target_options.append(cmdvalue[i])
+            elif cmdvalue[i].startswith('-iquote'):
+                self.target_options.append(cmdvalue[i])
+            elif cmdvalue[i] == '-I':
+                i += 1
+                self.target_include_I.append(cmdvalue[i])
+            elif cmdvalue[i].startswith('-I'):
+                self.target_include_I.append(cmdvalue[i][2:])
+            elif cmdvalue[i] == '-isystem':
+                i += 1
+                self.target_include_isystem.append(cmdvalue[i])
+            elif cmdvalue[i].startswith('-isystem'):
+                self.target_include_isystem.append(cmdvalue[i][8:])
+            elif cmdvalue[i] == '-idirafter':
+                self.target_options.append(cmdvalue[i])
+                i += 1
+                self.target_options.append(cmdvalue[i])
+            elif cmdvalue[i].startswith('-idirafter'):
+                self.target_options.append(cmdvalue[i])
+            # define
+            elif cmdvalue[i] == '-D':
+                i += 1
+                self.target_defines.append(cmdvalue[i])
+            elif cmdvalue[i].startswith('-D'):
+                self.target_defines.append(cmdvalue[i][2:])
+            # others
+            elif len(cmdvalue[i]) != 0:
+                self.target_options.append(cmdvalue[i])
+
+    # Write the target of one classified entry.
+    def write_cmake_target(self, fd, seq_num, item):
+        self.write_cmake_library(fd, self.target_name(seq_num), [item['file']])
+
+    # Name of the per-entry target; the variants of one file get a _variantN suffix.
+    def target_name(self, seq_num):
+        name = 'target_xxxxxx_%d' % seq_num
+        variant = self.variant_of.get(seq_num - 1)
+        if variant:
+            name += '_variant%d' % variant
+        return name
+
+    # Digest of the canonical form of one entry: directory and the tokenized
+    # arguments without the source, -o and -c.
+    def canonical_digest(self, item):
+        args = self.tokenize_entry(item) or []
+        while '-o' in args:
+            i = args.index('-o')
+            del args[i:i + 2]
+        source = item['file'].strip()
+        canonical = [item['directory']] + [a for a in args if a != source and a != '-c']
+        return hashlib.blake2b('\0'.join(canonical).encode('utf-8', errors='surrogatepass'), digest_size=16).digest()
+
+    # Drop the exact duplicates (same source, same canonical form) and number the
+    # variants (same source, other arguments), in one pass over a hash index.
+    # Returns a report of both, positions are those of the original db.
+    def remove_duplicates(self):
+        index = {}       # (source, digest) -> original position
+        by_source = {}   # source -> [position in kept]
+        kept = []
+        origin = []      # position in kept -> original position
+        removed = []
+        with self.stats.phase('dedupe'):
+            for i, item in enumerate(self.db):
+                source = os.path.normpath(os.path.join(item['directory'], item['file']))
+                key = (source, self.canonical_digest(item))
+                first = index.get(key)
+                if first is not None:
+                    removed.append({'index': i, 'file': item['file'], 'directory': item['directory'],
+                                    'duplicate_of': first})
+                    continue
+                index[key] = i
+                by_source.setdefault(source, []).append(len(kept))
+                kept.append(item)
+                origin.append(i)
+
+        self.db = kept
+        self.variant_of = {}
+        variants = []
+        for source, positions in by_source.items():
+            if len(positions) < 2:
+                continue
+            for n, pos in enumerate(positions, start=1):
+                self.variant_of[pos] = n
+            variants.append({'file': source,
+                             'entries': [origin[pos] for pos in positions],
+                             'targets': [self.target_name(pos + 1) for pos in positions]})
+        self.stats.count('duplicates_removed', len(removed))
+        self.stats.count('variant_files', len(variants))
+        return {'entries': len(origin) + len(removed), 'kept': len(kept), 'removed': removed, 'variants': variants}
+
+    # Write an OBJECT library of _files_ compiled with the current target_xxx flags.
+    def write_cmake_library(self, fd, name, files):
+        fd.write('add_library(%s OBJECT\n' % name)
+        # TODO: if directory entry is not CWD, adjust file path
+        for f in files:
+            fd.write('    %s\n' % f)
+        fd.write(')\n')
+
+        if len(self.target_options) > 0:
+            fd.write('target_compile_options(%s PRIVATE\n' % name)
+            for v in self.target_options:
+                fd.write('    %s\n' % v)
+            fd.write(')\n')
+
+        if len(self.target_defines) > 0:
+            fd.write('target_compile_definitions(%s PRIVATE\n' % name)
+            for v in self.target_defines:
+                fd.write('    %s\n' % v)
+            fd.write(')\n')
+
+        if len(self.target_include_I) > 0:
+            fd.write('target_include_directories(%s PRIVATE\n' % name)
+            for v in self.target_include_I:
+                fd.write('    %s\n' % v)
+            fd.write(')\n')
+
+        if len(self.target_include_isystem) > 0:
+            fd.write('target_include_directories(%s SYSTEM PRIVATE\n' % name)
+            for v in self.target_include_isystem:
+                fd.write('    %s\n' % v)
+            fd.write(')\n')
+
+    # Classify every entry: yield (item, (options, defines, include_I, include_isystem)).
+    def iter_classified(self):
+        for item in self.db:
+            with self.stats.phase('tokenize'):
+                cmdvalue = self.tokenize_entry(item)
+            with self.stats.phase('classify'):
+                self.classify_entry(item, cmdvalue)
+            yield item, (tuple(self.target_options), tuple(self.target_defines),
+                         tuple(self.target_include_I), tuple(self.target_include_isystem))
+
+    # Group the entries compiled with the same flags, in first-seen order.
+    def group_by_flags(self):
+        groups = {}
+        for item, flags in self.iter_classified():
+            groups.setdefault(flags, []).append(item)
+        return groups
+
+    # Write one OBJECT library per group of a build plan (see pch.plan_build()),
+    # with its precompiled headers and unity build batches.
+    def convert_groups_to_cmakelists(self, fd, groups):
+        self.write_cmake_header(fd, min_version='3.16')  # target_precompile_headers, UNITY_BUILD
+        for seq_num, group in enumerate(groups, start=1):
+            name = 'target_group_%d' % seq_num
+            (self.target_options, self.target_defines,
+             self.target_include_I, self.target_include_isystem) = (list(v) for v in group['flags'])
+            with self.stats.phase('write'):
+                self.write_cmake_library(fd, name, [item['file'] for item in group['items']])
+                if group.get('pch'):
+                    fd.write('target_precompile_headers(%s PRIVATE\n' % name)
+                    for h in group['pch']:
+                        fd.write('    %s\n' % h)
+                    fd.write(')\n')
+                if group.get('unity_batch_size'):
+                    fd.write('set_target_properties(%s PROPERTIES UNITY_BUILD ON UNITY_BUILD_BATCH_SIZE %d)\n'
+                             % (name, group['unity_batch_size']))
+                fd.write('\n')
+
+    def convert_db_to_ninja(self, fd):
+        """
+        Write a build.ninja which compiles every entry directly, no cmake configure needed.
+        One rule per distinct compiler + flags, one build edge per entry, headers tracked by depfile.
+        Entries writing the same output get a _variantN suffix on it, see remove_duplicates().
+        """
+        stats = self.stats
+        rules = {}  # (compiler, flags) -> rule name
+        edges = []  # (rule name, output, source, directory)
+        outputs = set()  # outputs of the edges
+        seen = set()  # edges before renaming
+        for pos, item in enumerate(self.db):
+            stats.distinct('paths', item['file'])
+            with stats.phase('tokenize'):
+                cmdvalue = self.tokenize_entry(item)
+            with stats.phase('classify'):
+                compiler, flags, output = self.split_ninja_entry(item, cmdvalue)
+                key = (compiler, tuple(flags))
+                if key not in rules:
+                    rules[key] = 'cc_%d' % (len(rules) + 1)
+            stats.distinct('flag_sets', key)
+            directory = item['directory']
+            source = os.path.normpath(os.path.join(directory, item['file']))
+            output = os.path.normpath(os.path.join(directory, output))
+            edge = (rules[key], output, source, directory)
+            if edge in seen:
+                stats.count('duplicate_edges')  # the same compile again, build it once
+                continue
+            seen.add(edge)
+            if output in outputs:
+                # one output per edge: a variant writing the same object gets its own
+                n = self.variant_of.get(pos) or 2
+                root, ext = os.path.splitext(output)
+                while '%s_variant%d%s' % (root, n, ext) in outputs:
+                    n += 1
+                print('WARN: %s is the output of several entries, %s writes %s_variant%d%s instead'
+                      % (output, source, root, n, ext))
+                edge = (rules[key], '%s_variant%d%s' % (root, n, ext), source, directory)
+                stats.count('renamed_outputs')
+            outputs.add(edge[1])
+            edges.append(edge)
+
+        with stats.phase('write'):
+            fd.write('# autogenerated from compile_commands.json\n')
+            fd.write('ninja_required_version = 1.3\n')
+            fd.write('\n')
+            msvc_rules = set()
+            for (compiler, flags), name in rules.items():
+                fd.write('rule %s\n' % name)
+                if is_msvc(compiler):
+                    # ninja runs commands on Windows without a shell: cmd does the cd and &&,
+                    # arguments are quoted the way the C runtime splits them
+                    msvc_rules.add(name)
+                    fd.write('  command = cmd /c cd /d $cwd && %s /nologo /showIncludes %s /c $in /Fo$out\n'
+                             % (ninja_escape(subprocess.list2cmdline([compiler])),
+                                ninja_escape(subprocess.list2cmdline(flags))))
+                    fd.write('  deps = msvc\n')
+                else:
+                    flags = ninja_escape(shlex.join(flags))
+                    fd.write('  command = cd $cwd && %s %s -MD -MF $out.d -c $in -o $out\n'
+                             % (ninja_escape(shlex.quote(compiler)), flags))
+                    fd.write('  depfile = $out.d\n')
+                    fd.write('  deps = gcc\n')
+                fd.write('  description = CC $out\n')
+                fd.write('\n')
+            for name, output, source, directory in edges:
+                fd.write('build %s: %s %s\n' % (ninja_escape_path(output), name, ninja_escape_path(source)))
+                quote = (lambda x: subprocess.list2cmdline([x])) if name in msvc_rules else shlex.quote
+                fd.write('  cwd = %s\n' % ninja_escape(quote(directory)))
+            fd.write('\n')
+            fd.write('default %s\n' % ' '.join(ninja_escape_path(e[1]) for e in edges))
+
+    # Split one entry into (compiler, flags, output): the source, -c, -o and
+    # dependency file options are dropped, build.ninja adds its own.
+    def split_ninja_entry(self, item, cmdvalue):
+        compiler = cmdvalue[0]
+        if is_msvc(compiler):
+            return self.split_msvc_entry(item, cmdvalue)
+        output = item.get('output')
+        source = item['file'].strip()
+        flags = []
+        i = 1
+        while i < len(cmdvalue):
+            a = cmdvalue[i]
+            if a == '-o' and i + 1 < len(cmdvalue):
+                output = output or cmdvalue[i + 1]
+                i += 1
+            elif a in ('-MF', '-MT', '-MQ'):
+                i += 1
+            elif a in ('-c', '-MD', '-MMD', '-M', '-MM', '-MP', source) \
+                    or a.startswith(('-MF', '-MT', '-MQ', '-Wp,-MD,', '-Wp,-MMD,')):
+                pass
+            elif a in _PATH_OPTIONS and i + 1 < len(cmdvalue):
+                flags += [a, _abspath(item['directory'], cmdvalue[i + 1])]
+                i += 1
+            elif a.startswith(_PATH_OPTIONS):
+                opt = next(o for o in _PATH_OPTIONS if a.startswith(o))
+                flags.append(opt + _abspath(item['directory'], a[len(opt):]))
+            else:
+                flags.append(a)
+            i += 1
+        if not output:
+            output = os.path.splitext(source)[0] + '.o'
+        return compiler, flags, output
+
+    # split_ninja_entry() for cl and clang-cl: only the source, /c, /Fo and
+    # /showIncludes are dropped, -MD, -MT and -MP pick the runtime and parallel builds.
+    def split_msvc_entry(self, item, cmdvalue):
+        compiler = cmdvalue[0]
+        output = item.get('output')
+        source = item['file'].strip()
+        flags = []
+        for a in cmdvalue[1:]:
+            if a.startswith(('/Fo', '-Fo')):
+                output = output or a[3:]
+            elif a in ('/c', '-c', '/showIncludes', '-showIncludes', source):
+                pass
+            else:
+                flags.append(a)
+        if not output:
+            output = os.path.splitext(source)[0] + '.obj'
+        return compiler, flags, output
+
+
+# options taking a path, made absolute in build.ninja: gcc writes depfile paths as
+# it finds them, and ninja reads them relative to build.ninja, not the entry's directory
+_PATH_OPTIONS = ('-isystem', '-iquote', '-idirafter', '-include', '-imacros', '-I')
+
+
+def _abspath(directory, path):
+    return path if os.path.isabs(path) else os.path.normpath(os.path.join(directory, path))
+
+
+def is_msvc(compiler):
+    """
+    cl and clang-cl take MSVC style options and print /showIncludes.
+    """
+    return os.path.basename(compiler.replace('\\', '/')).lower() in ('cl', 'cl.exe', 'clang-cl', 'clang-cl.exe')
+
+
+def ninja_escape(text):
+    """
+    $ is ninja's only special character in commands.
+    """
+    return text.replace('$', '$$')
+
+
+def ninja_escape_path(path):
+    """
+    paths in build lines also need spaces and colons escaped.
+    """
+    return path.replace('$', '$$').replace(' ', '$ ').replace(':', '$:')